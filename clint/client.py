@@ -6,7 +6,7 @@ Features:
 - Connects to chat server
 - User authentication (login/register)
 - Send/receive encrypted messages
-- Two-threaded design (send + receive simultaneously)
+- Single-threaded event loop (socket + keyboard multiplexed)
 - Clean command-line interface
 
 Usage:
@@ -14,6 +14,8 @@ Usage:
 """
 
 import socket
+import selectors
+import ssl
 import threading
 import sys
 import os
@@ -22,61 +24,135 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
-from security.tls_setup import TLSConfig
+from protocol import FrameDecoder, MODE_LOGIN, MODE_REGISTER, pack_auth, pack_frame, recv_frame, send_frame
+from security.tls_setup import TLSSessionCache, get_client_context
+
+# Authentication replies as they arrive on the wire, encoded once at import
+AUTH_REQUIRED_B = config.AUTH_REQUIRED.encode('utf-8')
+AUTH_SUCCESS_B = config.AUTH_SUCCESS.encode('utf-8')
 
 
 class ChatClient:
     
+    # Shared by every ChatClient in the process so reconnects can resume
+    # the previous TLS session
+    _tls_sessions = TLSSessionCache(config.TLS_SESSION_CACHE_SIZE, config.TLS_SESSION_TTL)
+    
+    # Server authentication failure codes -> message shown to the user
+    AUTH_ERRORS = {
+        config.USERNAME_EXISTS.encode('utf-8'): "\n Username already exists. Please try logging in.",
+        config.AUTH_FAILED.encode('utf-8'): "\n Authentication failed. Invalid credentials.",
+    }
+    
     def __init__(self, host=None, port=None):
       
         self.host = host or config.SERVER_HOST
         self.port = port or config.SERVER_PORT
         
-        # Create socket
-        self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        
-        # Initialize TLS configuration
-        self.tls_config = TLSConfig()
+        # Socket is opened by connect()
+        self.client_socket = None
         
         # Client state
         self.running = False
         self.username = None
         
+        # Event loop state: one selector for the socket and keyboard
+        self.selector = selectors.DefaultSelector()
+        self.outbox = bytearray()
+        self.socket_events = selectors.EVENT_READ
+        self.decoder = FrameDecoder(config.MAX_FRAME_SIZE, config.BUFFER_SIZE, text=True)
+        self.stdin_buffer = b''
+        self.stdin_source = None
+        self.read_stdin = None
+        
         print("\n" + "="*60)
         print(" SECURE BUSINESS CHAT CLIENT")
         print("="*60)
     
+    @staticmethod
+    def _kernel_limit(name):
+        """
+        Read net.core.<name> on Linux; other platforms report no limit.
+        """
+        try:
+            with open(f"/proc/sys/net/core/{name}") as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return float('inf')
+    
+    def tune_socket(self, sock):
+        """
+        Disable Nagle and size the socket buffers for the link.
+        
+        Linux derives the window scale from the net.core maxima, so sizing
+        the buffers right after connect still takes full effect.
+        """
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        
+        # Acknowledge small messages immediately (Linux only)
+        if hasattr(socket, 'TCP_QUICKACK'):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+        
+        size = config.SOCKET_BUFFER_BYTES
+        if not size:
+            return
+        
+        for option, limit in ((socket.SO_RCVBUF, 'rmem_max'), (socket.SO_SNDBUF, 'wmem_max')):
+            if self._kernel_limit(limit) < size:
+                continue
+            sock.setsockopt(socket.SOL_SOCKET, option, size)
+        
+        rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+        print(f"[*] Socket buffers: recv={rcvbuf} send={sndbuf} bytes")
+    
     def connect(self):
      
         try:
             print(f"\n[*] Connecting to {self.host}:{self.port} (TLS)...")
             
-            # Create TLS context for client
-            tls_context = self.tls_config.create_client_context(verify=False)
+            # TLS context for client (built once per process)
+            tls_context = get_client_context(verify=False)
             
-            # Wrap socket with TLS
-            self.client_socket = tls_context.wrap_socket(
-                self.client_socket, 
-                server_hostname=self.host
-            )
+            # create_connection resolves IPv4/IPv6 and closes the raw socket
+            # if anything below fails; once wrapped, the TLS socket owns it
+            with socket.create_connection((self.host, self.port), timeout=config.CONNECT_TIMEOUT) as raw:
+                self.tune_socket(raw)
+                
+                # Wrap socket with TLS, offering the last session for resumption
+                self.client_socket = tls_context.wrap_socket(
+                    raw,
+                    server_hostname=self.host,
+                    session=self._tls_sessions.get(self.host, self.port)
+                )
             
-            # Connect to server
-            self.client_socket.connect((self.host, self.port))
+            # The timeout only bounds connect + handshake
+            self.client_socket.settimeout(None)
+            self._tls_sessions.put(self.host, self.port, self.client_socket.session)
             
-            print(" Connected to server with TLS encryption!")
+            if self.client_socket.session_reused:
+                print(" Connected to server with TLS encryption! (session resumed)")
+            else:
+                print(" Connected to server with TLS encryption!")
             return True
         except Exception as e:
             print(f" Connection failed: {e}")
             return False
     
+    def recv_reply(self):
+        data = recv_frame(self.client_socket, config.MAX_FRAME_SIZE)
+        if data is None:
+            raise ConnectionError("Server closed the connection")
+        return data
+    
     def authenticate(self):
       
         try:
             # Receive AUTH_REQUIRED
-            response = self.client_socket.recv(1024).decode('utf-8')
+            response = self.recv_reply()
             
-            if response != config.AUTH_REQUIRED:
-                print(f" Unexpected server response: {response}")
+            if response != AUTH_REQUIRED_B:
+                print(f" Unexpected server response: {response.decode('utf-8', 'replace')}")
                 return False
             
             # Ask user for login or register
@@ -88,45 +164,29 @@ class ChatClient:
             print("="*60)
             
             while True:
-                choice = input("\nEnter choice (1 or 2): ").strip()
+                choice = self.input_line("\nEnter choice (1 or 2): ").strip()
                 
                 if choice == '1':
-                    self.client_socket.send(config.LOGIN.encode('utf-8'))
+                    mode = MODE_LOGIN
                     break
                 elif choice == '2':
-                    self.client_socket.send(config.REGISTER.encode('utf-8'))
+                    mode = MODE_REGISTER
                     break
                 else:
                     print("Invalid choice. Please enter 1 or 2.")
             
-            # Receive ENTER_USERNAME
-            response = self.client_socket.recv(1024).decode('utf-8')
-            
-            if response != config.ENTER_USERNAME:
-                print(f" Error: {response}")
-                return False
-            
-            # Send username
-            username = input("Username (min 3 characters): ").strip()
-            self.client_socket.send(username.encode('utf-8'))
-            
-            # Receive ENTER_PASSWORD
-            response = self.client_socket.recv(1024).decode('utf-8')
-            
-            if response != config.ENTER_PASSWORD:
-                print(f" Error: {response}")
-                return False
+            username = self.input_line("Username (min 3 characters): ").strip()
+            password = self.input_line("Password (min 4 characters): ").strip()
             
-            # Send password
-            password = input("Password (min 4 characters): ").strip()
-            self.client_socket.send(password.encode('utf-8'))
+            # Send mode, username and password as a single request
+            send_frame(self.client_socket, pack_auth(mode, username, password))
             
             # Receive authentication result
-            response = self.client_socket.recv(1024).decode('utf-8')
+            response = self.recv_reply()
             
-            if response.startswith(config.AUTH_SUCCESS):
+            if response[:len(AUTH_SUCCESS_B)] == AUTH_SUCCESS_B:
                 # Extract username from response
-                parts = response.split('|')
+                parts = response.decode('utf-8', 'replace').split('|')
                 if len(parts) > 1:
                     self.username = parts[1]
                 else:
@@ -136,17 +196,10 @@ class ChatClient:
                 print(f" Logged in as: {self.username}")
                 return True
             
-            elif response == config.USERNAME_EXISTS:
-                print("\n Username already exists. Please try logging in.")
-                return False
-            
-            elif response == config.AUTH_FAILED:
-                print("\n Authentication failed. Invalid credentials.")
-                return False
-            
-            else:
-                print(f"\n Error: {response}")
-                return False
+            # Known failure codes map straight to their explanation
+            error = self.AUTH_ERRORS.get(response)
+            print(error or f"\n Error: {response.decode('utf-8', 'replace')}")
+            return False
         
         except Exception as e:
             print(f" Authentication error: {e}")
@@ -154,33 +207,166 @@ class ChatClient:
     
     def receive_messages(self):
         """
-        Continuously receive messages from server (runs in separate thread).
+        Drain everything the server has sent (called when the socket is readable).
+        
+        Output for the whole drain is written to the terminal at once, so a
+        burst of messages costs one write and flush instead of two per message.
         """
+        output = []
         while self.running:
             try:
-                # Receive message (TLS provides encryption)
-                message_data = self.client_socket.recv(config.BUFFER_SIZE)
-                
-                if not message_data:
-                    print("\n[!] Connection closed by server")
-                    self.running = False
-                    break
-                
-                # Decode message
-                message = message_data.decode('utf-8')
-                
-                # Display message
-                print(f"\n{message}")
-                print(f"{self.username}> ", end='', flush=True)
+                # Receive straight into the decoder's buffer (TLS provides encryption)
+                frames = self.decoder.recv_from(self.client_socket)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                break
             
-            except Exception as e:
-                if self.running:
-                    print(f"\n[!] Error receiving message: {e}")
+            if frames is None:
+                output.append("\n[!] Connection closed by server\n")
+                self.running = False
                 break
+            
+            # Frames arrive already decoded from the receive buffer
+            for message in frames:
+                output.append(f"\n{message}\n")
+        
+        if not output:
+            return
+        
+        # Re-draw the prompt once after the batch
+        if self.running:
+            output.append(f"{self.username}> ")
+        sys.stdout.write(''.join(output))
+        sys.stdout.flush()
     
     def send_messages(self):
         """
-        Handle user input and send messages to server (runs in main thread).
+        Read typed lines and send them to the server (called when stdin is readable).
+        """
+        chunk = self.read_stdin(config.BUFFER_SIZE)
+        
+        # End of input behaves like /quit
+        if not chunk:
+            print("\n[*] Disconnecting...")
+            self.running = False
+            return
+        
+        self.stdin_buffer += chunk
+        self.send_lines()
+    
+    def send_lines(self):
+        """Send every complete line waiting in stdin_buffer."""
+        *lines, self.stdin_buffer = self.stdin_buffer.split(b'\n')
+        
+        for line in lines:
+            message = line.decode('utf-8', 'replace').rstrip('\r')
+            
+            # Check for quit command
+            if message.strip().upper() == '/QUIT':
+                print("\n[*] Disconnecting...")
+                self.running = False
+                return
+            
+            # Don't send empty messages
+            if message.strip():
+                data = message.encode('utf-8')
+                if len(data) > config.MAX_MESSAGE_LENGTH:
+                    print(f"\n Message not sent: longer than {config.MAX_MESSAGE_LENGTH} bytes")
+                else:
+                    # Send message (TLS provides encryption)
+                    self.send(pack_frame(data))
+            
+            print(f"{self.username}> ", end='', flush=True)
+    
+    def send(self, data):
+        """
+        Queue data for the server and write as much as the socket accepts.
+        
+        With nothing already pending the frame goes straight to the socket;
+        only an unsent tail is copied into the outbox.
+        """
+        if not self.outbox:
+            try:
+                sent = self.client_socket.send(data)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                sent = 0
+            if sent == len(data):
+                return
+            data = memoryview(data)[sent:]
+        
+        self.outbox += data
+        self.flush_outbox()
+    
+    def flush_outbox(self):
+        """
+        Write pending data; wait for EVENT_WRITE only while some is left over.
+        """
+        while self.outbox:
+            try:
+                sent = self.client_socket.send(self.outbox)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                break
+            del self.outbox[:sent]
+        
+        events = selectors.EVENT_READ
+        if self.outbox:
+            events |= selectors.EVENT_WRITE
+        
+        # Only touch the kernel registration when the interest set changes
+        if events != self.socket_events:
+            self.selector.modify(self.client_socket, events, self.on_socket_event)
+            self.socket_events = events
+    
+    def on_socket_event(self, mask):
+        if mask & selectors.EVENT_WRITE:
+            self.flush_outbox()
+        if mask & selectors.EVENT_READ:
+            self.receive_messages()
+    
+    def open_stdin(self):
+        """
+        Set up the single reader used for all keyboard input.
+        
+        Credentials and chat lines come through the same reader and
+        stdin_buffer, so nothing typed (or piped) ahead is lost in a
+        separate buffer. Windows selectors only accept sockets, so there a
+        small reader thread forwards stdin through a socket pair instead.
+        """
+        if sys.platform != 'win32':
+            fd = sys.stdin.fileno()
+            self.stdin_source = fd
+            self.read_stdin = lambda size: os.read(fd, size)
+            return
+        
+        reader, writer = socket.socketpair()
+        
+        def forward_stdin():
+            with writer:
+                for line in sys.stdin:
+                    writer.sendall(line.encode('utf-8'))
+        
+        threading.Thread(target=forward_stdin, daemon=True).start()
+        self.stdin_source = reader
+        self.read_stdin = reader.recv
+    
+    def input_line(self, prompt):
+        """Blocking input() replacement that reads through stdin_buffer."""
+        print(prompt, end='', flush=True)
+        while b'\n' not in self.stdin_buffer:
+            chunk = self.read_stdin(config.BUFFER_SIZE)
+            if not chunk:
+                raise EOFError("End of input")
+            self.stdin_buffer += chunk
+        
+        line, self.stdin_buffer = self.stdin_buffer.split(b'\n', 1)
+        return line.decode('utf-8', 'replace').rstrip('\r')
+    
+    def register_stdin(self):
+        """Hook keyboard input into the selector."""
+        self.selector.register(self.stdin_source, selectors.EVENT_READ, lambda mask: self.send_messages())
+    
+    def run_event_loop(self):
+        """
+        Multiplex the server socket and keyboard input on one thread.
         """
         print("\n" + "="*60)
         print("CHAT STARTED")
@@ -190,33 +376,36 @@ class ChatClient:
         print("  Just type to send messages")
         print("="*60 + "\n")
         
-        while self.running:
-            try:
-                # Get user input
-                message = input(f"{self.username}> ")
-                
-                # Check for quit command
-                if message.strip().upper() == '/QUIT':
-                    print("\n[*] Disconnecting...")
-                    self.running = False
-                    break
-                
-                # Don't send empty messages
-                if not message.strip():
-                    continue
-                
-                # Send message (TLS provides encryption)
-                message_data = message.encode('utf-8')
-                self.client_socket.send(message_data)
+        self.client_socket.setblocking(False)
+        self.selector.register(self.client_socket, self.socket_events, self.on_socket_event)
+        self.register_stdin()
+        
+        print(f"{self.username}> ", end='', flush=True)
+        
+        try:
+            # Lines read ahead while authenticating
+            if b'\n' in self.stdin_buffer:
+                self.send_lines()
             
-            except KeyboardInterrupt:
-                print("\n[*] Disconnecting...")
-                self.running = False
-                break
-            except Exception as e:
-                if self.running:
-                    print(f"\n[!] Error sending message: {e}")
-                break
+            # Frames that arrived during authentication may already sit
+            # in the TLS buffer where select() cannot see them
+            self.receive_messages()
+            
+            while self.running:
+                for key, mask in self.selector.select():
+                    key.data(mask)
+                    if not self.running:
+                        break
+        
+        except KeyboardInterrupt:
+            print("\n[*] Disconnecting...")
+            self.running = False
+        except Exception as e:
+            if self.running:
+                print(f"\n[!] Connection error: {e}")
+            self.running = False
+        finally:
+            self.selector.close()
     
     def start(self):
         """
@@ -228,6 +417,7 @@ class ChatClient:
                 return
             
             # Authenticate
+            self.open_stdin()
             if not self.authenticate():
                 print("\n[!] Authentication failed. Exiting...")
                 return
@@ -235,13 +425,8 @@ class ChatClient:
             # Start running
             self.running = True
             
-            # Start receive thread
-            receive_thread = threading.Thread(target=self.receive_messages)
-            receive_thread.daemon = True
-            receive_thread.start()
-            
-            # Start send loop (main thread)
-            self.send_messages()
+            # Socket and keyboard share one selector loop (main thread)
+            self.run_event_loop()
         
         except Exception as e:
             print(f"\n Client error: {e}")
@@ -255,6 +440,13 @@ class ChatClient:
         """
         self.running = False
         
+        try:
+            # TLS 1.3 tickets arrive after the handshake, so refresh the
+            # cached session before the socket goes away
+            self._tls_sessions.put(self.host, self.port, self.client_socket.session)
+        except (AttributeError, ValueError):
+            pass
+        
         try:
             self.client_socket.close()
         except:
@@ -1,19 +1,88 @@
 # clint/gui_client.py - Graphical User Interface Chat Client
 
 import socket
+import selectors
+import ssl
 import threading
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, simpledialog, ttk
+from tkinter import font as tkfont
 import sys
 import os
-from datetime import datetime
+import time
+from collections import deque
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
+from protocol import FrameDecoder, MODE_LOGIN, MODE_REGISTER, append_frame, pack_auth, recv_frame, send_frame
 from security.tls_setup import TLSConfig
 
+# Authentication replies as they arrive on the wire, encoded once at import
+AUTH_REQUIRED_B = config.AUTH_REQUIRED.encode('utf-8')
+AUTH_SUCCESS_B = config.AUTH_SUCCESS.encode('utf-8')
+
+# Display limits read on every flush, bound once at import
+CHAT_MAX_LINES = config.CHAT_MAX_LINES
+CHAT_TRIM_LINES = config.CHAT_TRIM_LINES
+
+# Queued chat lines are drawn at most once per frame (~30 Hz)
+DISPLAY_FLUSH_MS = 33
+
+# Header status texts; the online title is filled in once per login
+STATUS_OFFLINE = "🔒 Secure Business Chat - Not Connected"
+STATUS_ONLINE = "🔒 Secure Business Chat - Connected as {} (TLS)".format
+CONNECTION_OFFLINE = "● Offline (TLS)"
+CONNECTION_ONLINE = "● Online (TLS)"
+
+# Named Tk fonts shared by every widget: key -> (Tk name, size, weight)
+FONT_FAMILY = "Segoe UI"
+FONTS = {
+    'title': ("ChatTitle", 20, "bold"),
+    'header': ("ChatHeader", 14, "bold"),
+    'heading': ("ChatHeading", 11, "bold"),
+    'entry': ("ChatEntry", 11, "normal"),
+    'label': ("ChatLabel", 10, "bold"),
+    'body': ("ChatBody", 10, "normal"),
+    'small': ("ChatSmall", 9, "normal"),
+    'timestamp': ("ChatTimestamp", 8, "normal"),
+}
+
+# Chat display text tags
+TAG_SERVER = "server"
+TAG_SELF = "self"
+TAG_OTHER = "other"
+TAG_TIMESTAMP = "timestamp"
+TAG_USERNAME = "username"
+
+# Prefixes of server-generated lines
+USERS_LIST_PREFIX = "[USERS_LIST]"
+SERVER_PREFIX = "[SERVER]"
+
+# Authentication failure replies -> dialog text
+AUTH_ERRORS = {
+    config.USERNAME_EXISTS.encode('utf-8'): "Username already exists. Please try logging in.",
+    config.AUTH_FAILED.encode('utf-8'): "Authentication failed. Invalid credentials.",
+}
+
+
+def load_fonts(master):
+    """
+    Create the shared named fonts, or look up the ones already created.
+    
+    Widgets then refer to one Tcl font object each instead of parsing a
+    font description per widget.
+    """
+    existing = set(tkfont.names(master))
+    fonts = {}
+    for key, (name, size, weight) in FONTS.items():
+        if name in existing:
+            fonts[key] = tkfont.nametofont(name, root=master)
+        else:
+            fonts[key] = tkfont.Font(master, name=name, family=FONT_FAMILY, size=size, weight=weight)
+    return fonts
+
 
 class LoginWindow:
     """
@@ -38,6 +107,11 @@ class LoginWindow:
         
         self.create_widgets()
         
+        # Set once the dialog is answered or closed. The window is hidden
+        # rather than destroyed so a later login (after logout) can reuse it
+        self.done = tk.BooleanVar(self.window, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+        
         self.window.transient(parent)
         self.window.grab_set()
     
@@ -52,6 +126,8 @@ class LoginWindow:
     
     def create_widgets(self):
         """Create login window widgets."""
+        fonts = load_fonts(self.window)
+        
         header_frame = tk.Frame(self.window, bg='#0f3460', height=100)
         header_frame.pack(fill=tk.X, pady=(0, 20))
         header_frame.pack_propagate(False)
@@ -59,7 +135,7 @@ class LoginWindow:
         title_label = tk.Label(
             header_frame,
             text="🔒 Secure Business Chat",
-            font=("Segoe UI", 20, "bold"),
+            font=fonts['title'],
             bg='#0f3460',
             fg='#e94560'
         )
@@ -68,7 +144,7 @@ class LoginWindow:
         subtitle_label = tk.Label(
             header_frame,
             text="Enterprise-Grade Encrypted Messaging",
-            font=("Segoe UI", 9),
+            font=fonts['small'],
             bg='#0f3460',
             fg='#16213e'
         )
@@ -82,7 +158,7 @@ class LoginWindow:
         username_label = tk.Label(
             content_frame,
             text="Username",
-            font=("Segoe UI", 10, "bold"),
+            font=fonts['label'],
             bg='#1a1a2e',
             fg='#ffffff',
             anchor='w'
@@ -91,7 +167,7 @@ class LoginWindow:
         
         self.username_entry = tk.Entry(
             content_frame,
-            font=("Segoe UI", 11),
+            font=fonts['entry'],
             bg='#16213e',
             fg='#ffffff',
             insertbackground='#e94560',
@@ -104,7 +180,7 @@ class LoginWindow:
         password_label = tk.Label(
             content_frame,
             text="Password",
-            font=("Segoe UI", 10, "bold"),
+            font=fonts['label'],
             bg='#1a1a2e',
             fg='#ffffff',
             anchor='w'
@@ -113,7 +189,7 @@ class LoginWindow:
         
         self.password_entry = tk.Entry(
             content_frame,
-            font=("Segoe UI", 11),
+            font=fonts['entry'],
             bg='#16213e',
             fg='#ffffff',
             insertbackground='#e94560',
@@ -134,7 +210,7 @@ class LoginWindow:
             command=self.login,
             bg="#e94560",
             fg="white",
-            font=("Segoe UI", 11, "bold"),
+            font=fonts['heading'],
             relief=tk.FLAT,
             cursor="hand2",
             activebackground="#d63447",
@@ -149,7 +225,7 @@ class LoginWindow:
             command=self.register,
             bg="#0f3460",
             fg="white",
-            font=("Segoe UI", 11, "bold"),
+            font=fonts['heading'],
             relief=tk.FLAT,
             cursor="hand2",
             activebackground="#16213e",
@@ -178,7 +254,7 @@ class LoginWindow:
         
         self.is_register = False
         self.success = True
-        self.window.destroy()
+        self.close()
     
     def register(self):
         """Handle register button click."""
@@ -195,7 +271,29 @@ class LoginWindow:
         
         self.is_register = True
         self.success = True
-        self.window.destroy()
+        self.close()
+    
+    def cancel(self):
+        """Handle the window being closed without logging in."""
+        self.success = False
+        self.close()
+    
+    def close(self):
+        """Hide the dialog and release whoever is waiting on it."""
+        self.window.grab_release()
+        self.window.withdraw()
+        self.done.set(True)
+    
+    def show(self):
+        """Reset the dialog and open it again for another login."""
+        self.password_entry.delete(0, tk.END)
+        self.is_register = False
+        self.success = False
+        self.done.set(False)
+        
+        self.window.deiconify()
+        self.window.grab_set()
+        self.username_entry.focus()
 
 
 class ChatGUI:
@@ -217,6 +315,31 @@ class ChatGUI:
         # Client state
         self.running = False
         self.username = None
+        self.self_prefix = None  # "<username>:", set once logged in
+        self.special_prefixes = ()  # Every prefix that isn't a plain chat line
+        
+        # Network thread state: after login all socket I/O happens on one
+        # selector-driven thread; the GUI only queues outgoing frames
+        self.selector = None
+        self.network_thread = None
+        self.wake_reader = None
+        self.wake_writer = None
+        self.decoder = FrameDecoder(config.MAX_FRAME_SIZE, config.BUFFER_SIZE, text=True)
+        self.outbox = bytearray()
+        self.outbox_lock = threading.Lock()
+        
+        # Bumped on logout, so an I/O thread that outlives its session
+        # stops and cleans up only what it was started with
+        self.session = 0
+        self.socket_events = selectors.EVENT_READ
+        
+        # Messages waiting to be drawn; flushed together by the Tk thread
+        self.pending_messages = deque()
+        self.pending_lock = threading.Lock()
+        self.flush_scheduled = False
+        self.display_lines = 0  # Lines currently in the chat display
+        self.timestamp_second = None
+        self.timestamp_text = ''
         
         # Create main window
         self.window = tk.Tk()
@@ -224,8 +347,16 @@ class ChatGUI:
         self.window.geometry(f"{config.GUI_WIDTH}x{config.GUI_HEIGHT}")
         self.window.configure(bg='#1a1a2e')
         
-        # Online users list
+        # Cleared before the window is destroyed; avoids a Tcl round-trip
+        # (winfo_exists) on every display update
+        self.window_alive = True
+        
+        # Login dialog, created on first use
+        self.login_window = None
+        
+        # Online users list, and the users currently shown in the listbox
         self.online_users = []
+        self.listbox_users = []
         
         # Center window
         self.center_window()
@@ -247,6 +378,9 @@ class ChatGUI:
     
     def create_widgets(self):
         """Create GUI widgets."""
+        # Kept on the instance: the named fonts live as long as these objects
+        self.fonts = fonts = load_fonts(self.window)
+        
         # Menu bar
         menubar = tk.Menu(self.window, bg='#16213e', fg='white')
         self.window.config(menu=menubar)
@@ -273,19 +407,19 @@ class ChatGUI:
         
         self.status_label = tk.Label(
             top_frame,
-            text="🔒 Secure Business Chat - Not Connected",
+            text=STATUS_OFFLINE,
             bg="#0f3460",
             fg="#e94560",
-            font=("Segoe UI", 14, "bold")
+            font=fonts['header']
         )
         self.status_label.pack(pady=10)
         
         self.connection_status = tk.Label(
             top_frame,
-            text="● Offline (TLS)",
+            text=CONNECTION_OFFLINE,
             bg="#0f3460",
             fg="#ff6b6b",
-            font=("Segoe UI", 9)
+            font=fonts['small']
         )
         self.connection_status.pack()
         
@@ -303,7 +437,7 @@ class ChatGUI:
             text="👥 Online Users",
             bg='#16213e',
             fg='#e94560',
-            font=("Segoe UI", 11, "bold")
+            font=fonts['heading']
         )
         sidebar_title.pack(pady=10, padx=10, anchor='w')
         
@@ -311,7 +445,7 @@ class ChatGUI:
             sidebar_frame,
             bg='#0f3460',
             fg='#ffffff',
-            font=("Segoe UI", 10),
+            font=fonts['body'],
             relief=tk.FLAT,
             selectbackground='#e94560',
             selectforeground='#ffffff',
@@ -329,7 +463,7 @@ class ChatGUI:
             chat_container,
             state='disabled',
             wrap=tk.WORD,
-            font=("Segoe UI", 10),
+            font=fonts['body'],
             bg="#16213e",
             fg="#ffffff",
             relief=tk.FLAT,
@@ -342,11 +476,11 @@ class ChatGUI:
         self.chat_display.pack(fill=tk.BOTH, expand=True)
         
         # Configure tags for different message types
-        self.chat_display.tag_config("server", foreground="#ff6b6b", font=("Segoe UI", 10, "bold"))
-        self.chat_display.tag_config("self", foreground="#51cf66", font=("Segoe UI", 10, "bold"))
-        self.chat_display.tag_config("other", foreground="#4dabf7", font=("Segoe UI", 10))
-        self.chat_display.tag_config("timestamp", foreground="#868e96", font=("Segoe UI", 8))
-        self.chat_display.tag_config("username", foreground="#ffd43b", font=("Segoe UI", 10, "bold"))
+        self.chat_display.tag_config(TAG_SERVER, foreground="#ff6b6b", font=fonts['label'])
+        self.chat_display.tag_config(TAG_SELF, foreground="#51cf66", font=fonts['label'])
+        self.chat_display.tag_config(TAG_OTHER, foreground="#4dabf7", font=fonts['body'])
+        self.chat_display.tag_config(TAG_TIMESTAMP, foreground="#868e96", font=fonts['timestamp'])
+        self.chat_display.tag_config(TAG_USERNAME, foreground="#ffd43b", font=fonts['label'])
         
         # Bottom frame - Input area
         bottom_frame = tk.Frame(chat_container, bg="#0f3460", height=60)
@@ -359,7 +493,7 @@ class ChatGUI:
         
         self.message_entry = tk.Entry(
             input_container,
-            font=("Segoe UI", 11),
+            font=fonts['entry'],
             bg='#16213e',
             fg='#ffffff',
             insertbackground='#e94560',
@@ -377,7 +511,7 @@ class ChatGUI:
             command=self.send_message,
             bg="#e94560",
             fg="white",
-            font=("Segoe UI", 10, "bold"),
+            font=fonts['label'],
             relief=tk.FLAT,
             cursor="hand2",
             state='disabled',
@@ -394,7 +528,7 @@ class ChatGUI:
             command=self.clear_chat_display,
             bg="#0f3460",
             fg="white",
-            font=("Segoe UI", 9),
+            font=fonts['small'],
             relief=tk.FLAT,
             cursor="hand2",
             activebackground="#1a4d7a",
@@ -409,210 +543,377 @@ class ChatGUI:
                 self.chat_display.config(state='normal')
                 self.chat_display.delete(1.0, tk.END)
                 self.chat_display.config(state='disabled')
+                self.display_lines = 0
                 # Show confirmation message
-                self.display_message("[CLIENT] Chat display cleared (history still in database)", "server")
+                self.display_message("[CLIENT] Chat display cleared (history still in database)", TAG_SERVER)
         except Exception as e:
             print(f"[!] Error clearing chat display: {e}")
     
-    def display_message(self, message, tag="other"):
-        def _display():
-            try:
-                if self.chat_display.winfo_exists():
-                    self.chat_display.config(state='normal')
-                    
-                    # Add timestamp
-                    timestamp = datetime.now().strftime('%H:%M:%S')
-                    self.chat_display.insert(tk.END, f"[{timestamp}] ", "timestamp")
-                    
-                    # Parse and format message
-                    if ':' in message and not message.startswith('['):
-                        parts = message.split(':', 1)
-                        username = parts[0]
-                        content = parts[1]
-                        self.chat_display.insert(tk.END, username, "username")
-                        self.chat_display.insert(tk.END, ':', tag)
-                        self.chat_display.insert(tk.END, content + '\n', tag)
-                    else:
-                        self.chat_display.insert(tk.END, message + '\n', tag)
-                    
-                    self.chat_display.see(tk.END)
-                    self.chat_display.config(state='disabled')
-            except Exception as e:
-                pass
+    def display_message(self, message, tag=TAG_OTHER):
+        """Queue a message for the chat display (safe from any thread)."""
+        # Split "user: text" here, on the calling (usually I/O) thread, so
+        # the Tk thread's flush has no parsing left to do
+        username = None
+        if message[:1] != '[':
+            name, sep, content = message.partition(':')
+            if sep:
+                username, message = name, content
+        
+        # Timestamp when the message arrives, not when it is drawn; the
+        # formatted string is reused for every message in the same second
+        now = int(time.time())
+        
+        with self.pending_lock:
+            if now != self.timestamp_second:
+                self.timestamp_second = now
+                self.timestamp_text = time.strftime('[%H:%M:%S] ', time.localtime(now))
+            self.pending_messages.append((self.timestamp_text, username, message, tag))
+            if self.flush_scheduled:
+                return
+            self.flush_scheduled = True
+        
+        # Use after() to ensure thread-safe GUI updates; one flush per burst
+        if not self.window_alive:
+            return
+        try:
+            self.window.after(DISPLAY_FLUSH_MS, self.flush_pending_messages)
+        except (RuntimeError, tk.TclError):
+            # Window torn down between the check and the call
+            pass
+    
+    def flush_pending_messages(self):
+        """Draw every queued message with a single insert and scroll."""
+        with self.pending_lock:
+            pending = self.pending_messages
+            self.pending_messages = deque()
+            self.flush_scheduled = False
+        
+        # Tk's insert takes alternating text/tag arguments, so the whole
+        # batch goes to Tcl as one command
+        chunks = []
+        added = 0
+        for timestamp, username, text, tag in pending:
+            chunks += (timestamp, TAG_TIMESTAMP)
+            
+            # Chat lines get their sender highlighted
+            if username is None:
+                chunks += (text + '\n', tag)
+            else:
+                chunks += (username, TAG_USERNAME, ':', tag, text + '\n', tag)
+            added += text.count('\n') + 1
         
-        # Use after() to ensure thread-safe GUI updates
         try:
-            if hasattr(self, 'window') and self.window.winfo_exists():
-                self.window.after(0, _display)
+            if chunks and self.window_alive:
+                self.chat_display.config(state='normal')
+                self.chat_display.insert(tk.END, *chunks)
+                
+                # Keep the Text widget bounded so inserts and scrolling stay
+                # cheap; lines are counted here rather than queried from Tk
+                self.display_lines += added
+                if self.display_lines > CHAT_MAX_LINES:
+                    drop = self.display_lines - CHAT_MAX_LINES + CHAT_TRIM_LINES
+                    self.chat_display.delete('1.0', f'{drop + 1}.0')
+                    self.display_lines -= drop
+                
+                self.chat_display.see(tk.END)
+                self.chat_display.config(state='disabled')
         except Exception as e:
             pass
     
     def connect(self):
-        """Connect to the chat server using TLS."""
-        try:
-            self.display_message(f"[*] Connecting to {self.host}:{self.port} (TLS)...", "server")
-            
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        """
+        Connect to the chat server using TLS.
+        
+        Raises:
+            OSError: If the TCP connection or TLS handshake fails
+        """
+        self.display_message(f"[*] Connecting to {self.host}:{self.port} (TLS)...", TAG_SERVER)
+        
+        # Create TLS context for client
+        tls_context = self.tls_config.create_client_context(verify=False)
+        
+        # create_connection resolves IPv4/IPv6 and closes the raw socket
+        # if anything below fails; once wrapped, the TLS socket owns it
+        with socket.create_connection((self.host, self.port), timeout=config.CONNECT_TIMEOUT) as raw:
+            # Set socket options to prevent connection issues
+            raw.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             
-            # Create TLS context for client
-            tls_context = self.tls_config.create_client_context(verify=False)
+            # Acknowledge small messages immediately (Linux only)
+            if hasattr(socket, 'TCP_QUICKACK'):
+                raw.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
             
             # Wrap socket with TLS
             self.client_socket = tls_context.wrap_socket(
-                self.client_socket, 
+                raw,
                 server_hostname=self.host
             )
-            
-            # Set socket options to prevent connection issues
-            self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-            self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-            
-            # Set timeout for receive operations (30 seconds)
-            self.client_socket.settimeout(30.0)
-            
-            # Connect to server
-            self.client_socket.connect((self.host, self.port))
-            
-            self.display_message("✓ Connected to server with TLS encryption!", "server")
-            return True
         
+        # Bound blocking reads during authentication (30 seconds)
+        self.client_socket.settimeout(30.0)
+        
+        self.display_message("✓ Connected to server with TLS encryption!", TAG_SERVER)
+    
+    def recv_reply(self):
+        """Receive one framed protocol message as raw bytes."""
+        data = recv_frame(self.client_socket, config.MAX_FRAME_SIZE)
+        if data is None:
+            raise ConnectionError("Server closed the connection")
+        return data
+    
+    def prompt_login(self):
+        """
+        Collect credentials before connecting.
+        
+        Returns:
+            LoginWindow: The completed dialog, or None if it was closed
+        """
+        # Built once, then re-shown on later logins
+        if self.login_window is None:
+            self.login_window = LoginWindow(self.window)
+        else:
+            self.login_window.show()
+        
+        login_window = self.login_window
+        self.window.wait_variable(login_window.done)
+        
+        if not login_window.success:
+            return None
+        return login_window
+    
+    def authenticate(self, login_window):
+        """
+        Send the login request and read the server's verdict.
+        
+        Returns:
+            bytes: The raw result reply, or None if the server didn't ask to authenticate
+        """
+        # Receive AUTH_REQUIRED
+        response = self.recv_reply()
+        
+        if response != AUTH_REQUIRED_B:
+            self.display_message(f"✗ Unexpected server response: {response.decode('utf-8', 'replace')}", TAG_SERVER)
+            return None
+        
+        # Send mode, username and password as a single request
+        mode = MODE_REGISTER if login_window.is_register else MODE_LOGIN
+        send_frame(self.client_socket, pack_auth(mode, login_window.username, login_window.password))
+        
+        # Receive authentication result
+        return self.recv_reply()
+    
+    def login_worker(self, login_window):
+        """Connect and authenticate (runs in separate thread); results go back to Tk."""
+        try:
+            self.connect()
         except Exception as e:
-            self.display_message(f"✗ Connection failed: {e}", "server")
-            messagebox.showerror("Connection Error", f"Failed to connect to server:\n{e}")
-            return False
+            self.display_message(f"✗ Connection failed: {e}", TAG_SERVER)
+            self.run_on_tk(self.connection_failed, e)
+            return
+        
+        try:
+            response = self.authenticate(login_window)
+        except Exception as e:
+            self.display_message(f"✗ Authentication error: {e}", TAG_SERVER)
+            self.run_on_tk(self.login_failed, "Authentication Error", f"Authentication failed:\n{e}")
+            return
+        
+        self.run_on_tk(self.finish_login, login_window, response)
     
-    def authenticate(self):
-        """Handle authentication with server."""
+    def run_on_tk(self, callback, *args):
+        """Schedule a call on the Tk thread unless the window is gone."""
+        if not self.window_alive:
+            return
         try:
-            # Receive AUTH_REQUIRED
-            response = self.client_socket.recv(1024).decode('utf-8')
-            
-            if response != config.AUTH_REQUIRED:
-                self.display_message(f"✗ Unexpected server response: {response}", "server")
-                return False
-            
-            # Show login window
-            login_window = LoginWindow(self.window)
-            self.window.wait_window(login_window.window)
-            
-            if not login_window.success:
-                return False
-            
-            # Send login or register
-            if login_window.is_register:
-                self.client_socket.send(config.REGISTER.encode('utf-8'))
+            self.window.after(0, callback, *args)
+        except (RuntimeError, tk.TclError):
+            # Window torn down between the check and the call
+            pass
+    
+    def connection_failed(self, error):
+        messagebox.showerror("Connection Error", f"Failed to connect to server:\n{error}")
+        self.close_window()
+    
+    def login_failed(self, title=None, text=None):
+        """Report a failed login and close the window shortly after."""
+        if title:
+            messagebox.showerror(title, text)
+        
+        self.display_message("[!] Authentication failed. Exiting...", TAG_SERVER)
+        self.disconnect()
+        self.window.after(2000, self.close_window)
+    
+    def finish_login(self, login_window, response):
+        """Apply the authentication result on the Tk thread."""
+        if response is None:
+            self.login_failed()
+            return
+        
+        if not response.startswith(AUTH_SUCCESS_B):
+            # Known failure codes map straight to their dialog text
+            error = AUTH_ERRORS.get(response)
+            if error:
+                self.login_failed("Error", error)
             else:
-                self.client_socket.send(config.LOGIN.encode('utf-8'))
-            
-            # Receive ENTER_USERNAME
-            response = self.client_socket.recv(1024).decode('utf-8')
-            if response != config.ENTER_USERNAME:
-                self.display_message(f"✗ Error: {response}", "server")
-                return False
-            
-            # Send username
-            self.client_socket.send(login_window.username.encode('utf-8'))
-            
-            # Receive ENTER_PASSWORD
-            response = self.client_socket.recv(1024).decode('utf-8')
-            if response != config.ENTER_PASSWORD:
-                self.display_message(f"✗ Error: {response}", "server")
-                return False
-            
-            # Send password
-            self.client_socket.send(login_window.password.encode('utf-8'))
-            
-            # Receive authentication result
-            response = self.client_socket.recv(1024).decode('utf-8')
-            
-            if response.startswith(config.AUTH_SUCCESS):
-                # Extract username
-                parts = response.split('|')
-                self.username = parts[1] if len(parts) > 1 else login_window.username
-                
-                self.display_message(f"✓ Logged in as: {self.username}", "server")
-                self.status_label.config(text=f"🔒 Secure Business Chat - Connected as {self.username} (TLS)")
-                self.connection_status.config(text="● Online (TLS)", fg="#51cf66")
-                
-                # Don't add self here - server will send complete user list via [USERS_LIST]
-                
-                # Enable input
-                self.message_entry.config(state='normal')
-                self.send_button.config(state='normal')
-                self.message_entry.focus()
-                
-                return True
-            
-            elif response == config.USERNAME_EXISTS:
-                messagebox.showerror("Error", "Username already exists. Please try logging in.")
-                return False
-            
-            elif response == config.AUTH_FAILED:
-                messagebox.showerror("Error", "Authentication failed. Invalid credentials.")
-                return False
+                self.display_message(f"✗ Error: {response.decode('utf-8', 'replace')}", TAG_SERVER)
+                self.login_failed()
+            return
+        
+        # Extract username
+        parts = response.decode('utf-8', 'replace').split('|')
+        self.username = parts[1] if len(parts) > 1 else login_window.username
+        self.self_prefix = f"{self.username}:"
+        self.special_prefixes = (USERS_LIST_PREFIX, SERVER_PREFIX, self.self_prefix)
+        
+        self.display_message(f"✓ Logged in as: {self.username}", TAG_SERVER)
+        self.status_label.config(text=STATUS_ONLINE(self.username))
+        self.connection_status.config(text=CONNECTION_ONLINE, fg="#51cf66")
+        
+        # Don't add self here - server will send complete user list via [USERS_LIST]
+        
+        # Start running
+        self.running = True
+        
+        # Socket I/O moves to the selector thread
+        self.start_network()
+        
+        # Enable input
+        self.message_entry.config(state='normal')
+        self.send_button.config(state='normal')
+        self.message_entry.focus()
+    
+    def start_network(self):
+        """Switch the socket to non-blocking mode and start the I/O thread."""
+        self.client_socket.setblocking(False)
+        
+        # The GUI thread wakes the selector through a socket pair
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.client_socket, self.socket_events, self.on_socket_event)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ, self.on_wakeup)
+        
+        self.network_thread = threading.Thread(
+            target=self.network_loop,
+            args=(self.session, self.selector, self.client_socket, self.wake_reader, self.wake_writer),
+            daemon=True
+        )
+        self.network_thread.start()
+    
+    def network_loop(self, session, selector, sock, wake_reader, wake_writer):
+        """Multiplex server traffic and queued sends (runs in separate thread)."""
+        error = None
+        try:
+            # Frames that arrived during authentication may already sit
+            # in the TLS buffer where select() cannot see them
+            self.receive_messages()
             
-            else:
-                self.display_message(f"✗ Error: {response}", "server")
-                return False
+            while self.running and self.session == session:
+                for key, mask in selector.select():
+                    key.data(mask)
+                    if not self.running or self.session != session:
+                        break
         
+        except ConnectionAbortedError as e:
+            error = "[!] Connection lost. Please restart the client."
+        except ConnectionResetError as e:
+            error = "[!] Server disconnected. Please restart the client."
+        except OSError as e:
+            # Handle Windows socket errors
+            if getattr(e, 'winerror', None) == 10053:
+                error = "[!] Connection aborted. Check server status."
+            else:
+                error = f"[!] Network error: {e}"
         except Exception as e:
-            self.display_message(f"✗ Authentication error: {e}", "server")
-            messagebox.showerror("Authentication Error", f"Authentication failed:\n{e}")
-            return False
+            error = f"[!] Error: {e}"
+        
+        finally:
+            # After a logout the window belongs to the next session; only
+            # this thread's own selector and sockets are closed
+            if self.session == session:
+                if error and self.running:
+                    self.display_message(error, TAG_SERVER)
+                self.running = False
+            selector.close()
+            wake_reader.close()
+            wake_writer.close()
+            try:
+                sock.close()
+            except:
+                pass
+    
+    def wake_network(self):
+        """Interrupt the I/O thread's select() from the GUI thread."""
+        try:
+            self.wake_writer.send(b'\0')
+        except OSError:
+            # Pipe already full (a wakeup is pending) or already closed
+            pass
+    
+    def on_wakeup(self, mask):
+        try:
+            while self.wake_reader.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        self.flush_outbox()
+    
+    def on_socket_event(self, mask):
+        if mask & selectors.EVENT_WRITE:
+            self.flush_outbox()
+        if mask & selectors.EVENT_READ:
+            self.receive_messages()
+    
+    def flush_outbox(self):
+        """Write queued frames; wait for EVENT_WRITE only while some are left over."""
+        with self.outbox_lock:
+            while self.outbox:
+                try:
+                    sent = self.client_socket.send(self.outbox)
+                except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                    break
+                del self.outbox[:sent]
+            
+            events = selectors.EVENT_READ
+            if self.outbox:
+                events |= selectors.EVENT_WRITE
+        
+        # Only touch the kernel registration when the interest set changes
+        if events != self.socket_events:
+            self.selector.modify(self.client_socket, events, self.on_socket_event)
+            self.socket_events = events
     
     def receive_messages(self):
-        """Continuously receive messages from server (runs in separate thread)."""
+        """Drain everything the server has sent (called when the socket is readable)."""
         while self.running:
             try:
-                # Receive message (TLS provides encryption)
-                message_data = self.client_socket.recv(config.BUFFER_SIZE)
-                
-                if not message_data:
-                    self.display_message("[!] Connection closed by server", "server")
-                    self.running = False
-                    break
-                
-                # Decode message (TLS provides transport encryption)
-                message = message_data.decode('utf-8')
-                
+                # Receive straight into the decoder's buffer (TLS provides encryption)
+                frames = self.decoder.recv_from(self.client_socket)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                return
+            
+            if frames is None:
+                self.display_message("[!] Connection closed by server", TAG_SERVER)
+                self.running = False
+                return
+            
+            # Frames arrive already decoded from the receive buffer
+            for message in frames:
                 # Determine message type and display
                 # Note: We skip our own messages since we display them when sending
-                if message.startswith("[USERS_LIST]"):
+                if not message.startswith(self.special_prefixes):
+                    # Other users' lines (the common case) cost one C-level check
+                    self.display_message(message, TAG_OTHER)
+                elif message.startswith(USERS_LIST_PREFIX):
                     # Handle server-sent user list update
                     self.update_users_from_server(message)
-                elif message.startswith("[SERVER]"):
+                elif message.startswith(SERVER_PREFIX):
                     # Don't display history headers, just the actual messages
                     if "Recent Chat History" not in message and "End of History" not in message:
-                        self.display_message(message, "server")
-                elif message.startswith(f"{self.username}:"):
-                    pass
-                else:
-                    # Display all other messages (including history messages)
-                    self.display_message(message, "other")
-            
-            except socket.timeout:
-                continue
-            except ConnectionAbortedError as e:
-                if self.running:
-                    self.display_message("[!] Connection lost. Please restart the client.", "server")
-                break
-            except ConnectionResetError as e:
-                if self.running:
-                    self.display_message("[!] Server disconnected. Please restart the client.", "server")
-                break
-            except OSError as e:
-                # Handle Windows socket errors
-                if e.winerror == 10053:
-                    if self.running:
-                        self.display_message("[!] Connection aborted. Check server status.", "server")
-                else:
-                    if self.running:
-                        self.display_message(f"[!] Network error: {e}", "server")
-                break
-            except Exception as e:
-                if self.running:
-                    self.display_message(f"[!] Error: {e}", "server")
-                break
+                        self.display_message(message, TAG_SERVER)
+                # Otherwise it is our own line (including from history): skip
     
     def send_message(self):
         """Send a message to the server."""
@@ -623,41 +924,61 @@ class ChatGUI:
             if not message:
                 return
             
+            # Once the I/O thread has stopped nothing would send the frame
+            if not self.running or not (self.network_thread and self.network_thread.is_alive()):
+                self.display_message("[!] Not connected: message not sent", TAG_SERVER)
+                messagebox.showerror("Send Error", "Failed to send message:\nNot connected to the server")
+                return
+            
+            # The server refuses longer messages; keep the text for editing
+            data = message.encode('utf-8')
+            if len(data) > config.MAX_MESSAGE_LENGTH:
+                self.display_message(f"[!] Message not sent: longer than {config.MAX_MESSAGE_LENGTH} bytes", TAG_SERVER)
+                return
+            
             # Clear input
             self.message_entry.delete(0, tk.END)
             
             # Display own message immediately (since server won't echo it back)
             formatted_message = f"{self.username}: {message}"
-            self.display_message(formatted_message, "self")
+            self.display_message(formatted_message, TAG_SELF)
             
-            # Send message (TLS provides encryption)
-            message_data = message.encode('utf-8')
-            self.client_socket.send(message_data)
+            # Frame straight into the I/O thread's queue (TLS provides encryption).
+            # Frames queued in a burst share one flush: only the first needs
+            # a wakeup, later ones ride along or wait for EVENT_WRITE
+            with self.outbox_lock:
+                idle = not self.outbox
+                append_frame(self.outbox, data)
+            if idle:
+                self.wake_network()
         
         except Exception as e:
-            self.display_message(f"[!] Error sending message: {e}", "server")
+            self.display_message(f"[!] Error sending message: {e}", TAG_SERVER)
             messagebox.showerror("Send Error", f"Failed to send message:\n{e}")
     
-    def start(self):
-        """Start the chat client."""
-        # Connect to server
-        if not self.connect():
-            self.window.after(100, self.window.destroy)
-            return
+    def open_session(self):
+        """
+        Ask for credentials, then log in on a worker thread.
         
-        # Authenticate
-        if not self.authenticate():
-            self.display_message("[!] Authentication failed. Exiting...", "server")
-            self.window.after(2000, self.window.destroy)
-            return
+        The TCP connect, TLS handshake and login round-trip run off the Tk
+        thread so the window keeps repainting; finish_login() takes over once
+        the server has answered.
         
-        # Start running
-        self.running = True
+        Returns:
+            bool: False if the user closed the login window
+        """
+        login_window = self.prompt_login()
+        if not login_window:
+            self.window.after(100, self.close_window)
+            return False
         
-        # Start receive thread
-        receive_thread = threading.Thread(target=self.receive_messages)
-        receive_thread.daemon = True
-        receive_thread.start()
+        threading.Thread(target=self.login_worker, args=(login_window,), daemon=True).start()
+        return True
+    
+    def start(self):
+        """Start the chat client."""
+        if not self.open_session():
+            return
         
         # Start GUI main loop
         self.window.mainloop()
@@ -666,12 +987,24 @@ class ChatGUI:
         """Handle window close event."""
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
             self.disconnect()
-            self.window.destroy()
+            self.close_window()
+    
+    def close_window(self):
+        """Destroy the main window, marking it gone for other threads first."""
+        self.window_alive = False
+        self.window.destroy()
     
     def disconnect(self):
         """Disconnect from server and cleanup."""
         self.running = False
         
+        # The I/O thread owns the socket once started; let it close it
+        if self.network_thread and self.network_thread.is_alive():
+            self.wake_network()
+            self.network_thread.join(timeout=1.0)
+            if not self.network_thread.is_alive():
+                return
+        
         if self.client_socket:
             try:
                 self.client_socket.close()
@@ -679,14 +1012,43 @@ class ChatGUI:
                 pass
     
     def logout(self):
-        """Logout and restart the application to login as different user."""
+        """Logout and sign in again as a different user in the same window."""
         if messagebox.askyesno("Logout", "Do you want to logout and login as a different user?"):
             self.disconnect()
-            self.window.destroy()
-            
-            # Restart the GUI client
-            import subprocess
-            subprocess.Popen([sys.executable, __file__])
+            self.reset_session()
+            self.open_session()
+    
+    def reset_session(self):
+        """Return the window and connection state to their pre-login values."""
+        self.session += 1
+        self.client_socket = None
+        self.username = None
+        self.self_prefix = None
+        self.special_prefixes = ()
+        
+        self.selector = None
+        self.network_thread = None
+        self.wake_reader = None
+        self.wake_writer = None
+        self.decoder = FrameDecoder(config.MAX_FRAME_SIZE, config.BUFFER_SIZE, text=True)
+        self.outbox = bytearray()
+        self.socket_events = selectors.EVENT_READ
+        
+        with self.pending_lock:
+            self.pending_messages.clear()
+        
+        self.online_users = []
+        self.update_users_list()
+        
+        self.chat_display.config(state='normal')
+        self.chat_display.delete('1.0', tk.END)
+        self.chat_display.config(state='disabled')
+        self.display_lines = 0
+        
+        self.message_entry.config(state='disabled')
+        self.send_button.config(state='disabled')
+        self.status_label.config(text=STATUS_OFFLINE)
+        self.connection_status.config(text=CONNECTION_OFFLINE, fg="#ff6b6b")
     
     def show_help(self):
         """Show help dialog with available commands."""
@@ -741,12 +1103,25 @@ Developed with Python & Tkinter
         messagebox.showinfo("About", about_text)
     
     def update_users_list(self):
-        """Update the online users list."""
+        """Update the online users list, touching only rows that changed."""
         try:
-            self.users_listbox.delete(0, tk.END)
+            shown = self.listbox_users
+            online = set(self.online_users)
+            
+            # Remove users who left, from the bottom so indices stay valid
+            for index in range(len(shown) - 1, -1, -1):
+                if shown[index] not in online:
+                    self.users_listbox.delete(index)
+                    del shown[index]
+            
+            # Append newcomers in the server's order
+            present = set(shown)
             for user in self.online_users:
-                display_name = f"● {user}" if user == self.username else f"○ {user}"
-                self.users_listbox.insert(tk.END, display_name)
+                if user not in present:
+                    display_name = f"● {user}" if user == self.username else f"○ {user}"
+                    self.users_listbox.insert(tk.END, display_name)
+                    shown.append(user)
+                    present.add(user)
         except Exception as e:
             pass
     
@@ -754,17 +1129,12 @@ Developed with Python & Tkinter
         """Update users list based on server-sent user list."""
         try:
             # Extract users from message: [USERS_LIST] user1,user2,user3
-            users_str = message.replace("[USERS_LIST]", "").strip()
-            
-            if users_str:
-                # Split by comma and clean
-                users_list = [user.strip() for user in users_str.split(',') if user.strip()]
-            else:
-                users_list = []
+            # (split and strip in C, dropping empty names)
+            users_list = list(filter(None, map(str.strip, message[len(USERS_LIST_PREFIX):].split(','))))
             
-            # Update online users list
+            # Update online users list (the listbox belongs to the Tk thread)
             self.online_users = users_list
-            self.update_users_list()
+            self.run_on_tk(self.update_users_list)
             
             print(f"[*] Updated users list: {self.online_users}")
         
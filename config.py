@@ -4,22 +4,44 @@
 SERVER_HOST = '127.0.0.1' 
 SERVER_PORT = 5555
 MAX_CONNECTIONS = 100
+CONNECT_TIMEOUT = 10  # Seconds allowed for client connect + TLS handshake
+MAX_CLIENT_BACKLOG = 1024 * 1024  # Unsent bytes allowed per client before it is dropped
+AUTH_TIMEOUT = 120  # Seconds a new client has to send its credentials
+USER_LIST_DELAY = 0.05  # Seconds of joins/leaves gathered into one user-list broadcast
+
+# TCP keepalive on client connections: probe after KEEPALIVE_IDLE idle
+# seconds, every KEEPALIVE_INTERVAL, and drop after KEEPALIVE_COUNT misses
+KEEPALIVE_IDLE = 30
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 3
+
+# Socket buffer size for high bandwidth-delay links (0 = kernel default).
+# Only applied when net.core.{r,w}mem_max allow it, since a clamped
+# value would just disable the kernel's own buffer autotuning.
+SOCKET_BUFFER_BYTES = 4 * 1024 * 1024
 
 # Database Configuration
 DATABASE_NAME = 'data/chat_system.db'
 
+# TLS Configuration
+TLS_SESSION_TTL = 24 * 60 * 60  # Seconds a cached TLS session may be resumed
+TLS_SESSION_CACHE_SIZE = 32
+
 # Encryption Configuration
 ENCRYPTION_KEY = 'SecureBusinessChat2024Key!' 
 
 # Message Configuration
-MAX_MESSAGE_LENGTH = 4096
+MAX_MESSAGE_LENGTH = 4096  # Largest chat message in UTF-8 bytes; longer ones are refused
 BUFFER_SIZE = 4096
+MAX_FRAME_SIZE = 64 * 1024  # Largest length-prefixed frame accepted
 
 # GUI Configuration
 GUI_WIDTH = 800
 GUI_HEIGHT = 600
 CHAT_DISPLAY_HEIGHT = 25
 CHAT_DISPLAY_WIDTH = 80
+CHAT_MAX_LINES = 2000  # Oldest lines are trimmed beyond this
+CHAT_TRIM_LINES = 200  # Extra lines dropped per trim so it runs rarely
 
 # Protocol Messages
 AUTH_REQUIRED = 'AUTH_REQUIRED'
@@ -2,23 +2,198 @@
 
 import sqlite3
 import hashlib
+import logging
+import hmac
 from datetime import datetime
 import os
+import sys
+import threading
+import queue
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+# Per-call outcomes go out at DEBUG, so a production server pays only a
+# level check for them; the process that runs us configures handlers
+log = logging.getLogger(__name__)
+
+# Chat messages are written in batches: a batch is flushed once it holds
+# MESSAGE_FLUSH_COUNT rows, or MESSAGE_FLUSH_INTERVAL seconds after its
+# first row, whichever comes first
+MESSAGE_FLUSH_COUNT = 500
+MESSAGE_FLUSH_INTERVAL = 0.1
+
+# Connection tuning: WAL lets readers run while a write commits and, with
+# synchronous=NORMAL, syncs only at checkpoints instead of on every commit
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+)
+
+# Read-only connections for SELECTs, so lookups don't queue behind writes
+READER_POOL_SIZE = 4
+READER_PRAGMAS = (
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-16384',
+    'PRAGMA mmap_size=268435456',
+)
+
+# Statements on the hot paths, defined once; sqlite3 keeps each one
+# prepared in the connection's statement cache
+STATEMENT_CACHE_SIZE = 256
+INSERT_MESSAGE_SQL = 'INSERT INTO messages (username, message) VALUES (?, ?)'
+INSERT_USER_SQL = 'INSERT INTO users (username, password_hash, salt, kdf_params) VALUES (?, ?, ?, ?)'
+IMPORT_USER_SQL = 'INSERT OR IGNORE INTO users (username, password_hash, salt, kdf_params) VALUES (?, ?, ?, ?)'
+UPDATE_PASSWORD_SQL = 'UPDATE users SET password_hash = ?, salt = ?, kdf_params = ? WHERE username = ?'
+SELECT_PASSWORD_SQL = 'SELECT password_hash, salt, kdf_params FROM users WHERE username = ?'
+SELECT_USERNAME_SQL = 'SELECT 1 FROM users WHERE username = ?'
+# Last N messages, oldest first. The auto-increment id follows arrival
+# order, so the newest rows come straight off the primary key (no sort),
+# and timestamp ties within one second keep their real order
+SELECT_HISTORY_SQL = (
+    'SELECT username, message, timestamp FROM'
+    ' (SELECT id, username, message, timestamp FROM messages ORDER BY id DESC LIMIT ?)'
+    ' ORDER BY id'
+)
+# One page of older history: the N messages just before a given id
+SELECT_HISTORY_BEFORE_SQL = (
+    'SELECT id, username, message, timestamp FROM'
+    ' (SELECT id, username, message, timestamp FROM messages WHERE id < ? ORDER BY id DESC LIMIT ?)'
+    ' ORDER BY id'
+)
+SELECT_COUNTER_SQL = 'SELECT value FROM counters WHERE name = ?'
+SELECT_STATS_SQL = (
+    "SELECT (SELECT value FROM counters WHERE name = 'users'),"
+    " (SELECT value FROM counters WHERE name = 'messages')"
+)
+
+# Password KDF: scrypt with a per-user salt. The parameters are stored
+# with each hash ("scrypt$n$r$p") so they can be raised later without
+# breaking existing accounts; n=2**14 costs a few tens of ms per login
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KDF_PARAMS = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}"
+
+# Account rules, enforced by the server at sign-up and by bulk imports
+MIN_USERNAME_LENGTH = 3
+MIN_PASSWORD_LENGTH = 4
+
+# Lookup results kept in memory between logins
+LOOKUP_CACHE_SIZE = 4096
+LOOKUP_CACHE_TTL = 60
+
+
+class LookupCache:
+    """
+    Thread-safe LRU of boolean lookup results with a time-to-live.
+    
+    Only True/False is stored, never the rows themselves.
+    """
+    
+    def __init__(self, maxsize=LOOKUP_CACHE_SIZE, ttl=LOOKUP_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached result for key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            value, expires = entry
+            if time.monotonic() > expires:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key, value):
+        """Remember the result for key."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Forget every cached result."""
+        with self._lock:
+            self._entries.clear()
 
 
 class Database:
     
     def __init__(self, db_name='data/chat_system.db'):
    
-        os.makedirs(os.path.dirname(db_name), exist_ok=True)
+        os.makedirs(os.path.dirname(db_name) or '.', exist_ok=True)
      
-        self.conn = sqlite3.connect(db_name, check_same_thread=False)
+        # Autocommit: single statements commit on their own, batches run
+        # inside bulk_write()
+        self.conn = sqlite3.connect(
+            db_name,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
         self.cursor = self.conn.cursor()
+        for pragma in CONNECTION_PRAGMAS:
+            self.cursor.execute(pragma)
+        
+        # Hot write statements bound once to the writer, so each call is
+        # one local call with no attribute lookups or SQL argument
+        self.insert_messages = partial(self.conn.executemany, INSERT_MESSAGE_SQL)
+        self.insert_user = partial(self.cursor.execute, INSERT_USER_SQL)
+        self.import_users = partial(self.conn.executemany, IMPORT_USER_SQL)
+        self.update_password = partial(self.cursor.execute, UPDATE_PASSWORD_SQL)
+        
+        # Serializes writes on the shared connection (the flush timer
+        # writes from its own thread). Reentrant so writes can nest inside
+        # bulk_write()
+        self.write_lock = threading.RLock()
+        
+        # Messages waiting for the next batched insert
+        self.pending_messages = deque()
+        self.pending_lock = threading.Lock()
+        self.flush_timer = None
+        self.closed = False
+        
+        # Repeat logins and username checks answered from memory; both are
+        # cleared whenever a user registers
+        self.auth_cache = LookupCache()
+        self.cache_secret = os.urandom(32)
+        self.username_cache = LookupCache()
         
         # Create tables
         self.create_tables()
         
-        print(f"✓ Database initialized: {db_name}")
+        # Reader pool, opened once the schema exists; self.conn stays the
+        # only writer
+        self.readers = queue.Queue()
+        reader_uri = Path(db_name).resolve().as_uri() + '?mode=ro'
+        for _ in range(READER_POOL_SIZE):
+            reader = sqlite3.connect(
+                reader_uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE
+            )
+            for pragma in READER_PRAGMAS:
+                reader.execute(pragma)
+            self.readers.put(reader)
+        
+        log.info("✓ Database initialized: %s", db_name)
     
     def create_tables(self):
       
@@ -26,8 +201,10 @@ class Database:
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                password_hash BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                salt BLOB,
+                kdf_params TEXT
             )
         ''')
         
@@ -42,122 +219,363 @@ class Database:
             )
         ''')
         
-        self.conn.commit()
+        # Row counts kept up to date by triggers, so the stats are a
+        # lookup rather than a COUNT(*) scan. Seeded from the existing rows
+        # the first time this runs
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        for table in ('users', 'messages'):
+            self.cursor.execute(
+                f"INSERT OR IGNORE INTO counters (name, value) SELECT '{table}', COUNT(*) FROM {table}"
+            )
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_insert AFTER INSERT ON {table}
+                BEGIN
+                    UPDATE counters SET value = value + 1 WHERE name = '{table}';
+                END
+            ''')
+            self.cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_delete AFTER DELETE ON {table}
+                BEGIN
+                    UPDATE counters SET value = value - 1 WHERE name = '{table}';
+                END
+            ''')
+        
+        self.upgrade_users_table()
+    
+    def upgrade_users_table(self):
+        
+        # Older databases lack the salt/KDF columns; their rows keep a
+        # NULL salt (plain SHA-256) until the user next logs in
+        columns = {row[1] for row in self.cursor.execute('PRAGMA table_info(users)')}
+        for column, column_type in (('salt', 'BLOB'), ('kdf_params', 'TEXT')):
+            if column not in columns:
+                self.cursor.execute(f'ALTER TABLE users ADD COLUMN {column} {column_type}')
+        
+        # One-time upgrade: older databases stored the hex digest as TEXT
+        legacy = self.cursor.execute(
+            "SELECT id, password_hash FROM users WHERE typeof(password_hash) = 'text'"
+        ).fetchall()
+        if not legacy:
+            return
+        
+        with self.bulk_write():
+            self.cursor.executemany(
+                'UPDATE users SET password_hash = ? WHERE id = ?',
+                [(bytes.fromhex(hex_hash), user_id) for user_id, hex_hash in legacy]
+            )
+        log.info("✓ Upgraded %d stored password hash(es)", len(legacy))
+    
+    @contextmanager
+    def bulk_write(self):
+        
+        # Group writes into one transaction (one commit, one sync):
+        #     with db.bulk_write():
+        #         for username, message in replay:
+        #             db.log_message(username, message)
+        # Messages queued inside the block are flushed before it commits.
+        # Nested blocks join the outer transaction
+        with self.write_lock:
+            if self.conn.in_transaction:
+                yield
+                return
+            
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+                self.flush_messages()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+    
+    @contextmanager
+    def read_connection(self):
+        
+        # Borrow a reader for one query, waiting if all are in use
+        reader = self.readers.get()
+        try:
+            yield reader
+        finally:
+            self.readers.put(reader)
     
-    def hash_password(self, password):
+    def hash_password(self, password, salt, kdf_params=KDF_PARAMS):
       
-        return hashlib.sha256(password.encode()).hexdigest()
+        # Raw 32-byte scrypt digest, stored as a BLOB
+        name, n, r, p = kdf_params.split('$')
+        if name != 'scrypt':
+            raise ValueError(f"Unsupported password KDF: {name}")
+        return hashlib.scrypt(password.encode(), salt=salt, n=int(n), r=int(r), p=int(p), dklen=32)
+    
+    def legacy_hash_password(self, password):
+        
+        # Unsalted SHA-256 used by accounts created before scrypt
+        return hashlib.sha256(password.encode()).digest()
+    
+    def verify_password(self, username, password, stored_hash, salt, kdf_params):
+        
+        if salt is None:
+            if not hmac.compare_digest(self.legacy_hash_password(password), stored_hash):
+                return False
+            # Correct legacy password: move the account to scrypt
+            self.store_password(username, password)
+            return True
+        
+        return hmac.compare_digest(self.hash_password(password, salt, kdf_params), stored_hash)
+    
+    def store_password(self, username, password):
+        
+        salt = os.urandom(SALT_BYTES)
+        password_hash = self.hash_password(password, salt)
+        with self.write_lock:
+            self.update_password((password_hash, salt, KDF_PARAMS, username))
     
     def register_user(self, username, password):
         
         try:
-            password_hash = self.hash_password(password)
+            # A taken name is rejected from the (cached) lookup before paying
+            # for the KDF; the UNIQUE constraint still catches races
+            if self.username_exists(username):
+                log.debug("✗ Registration failed: Username '%s' already exists", username)
+                return False
             
-            self.cursor.execute(
-                'INSERT INTO users (username, password_hash) VALUES (?, ?)',
-                (username, password_hash)
-            )
+            salt = os.urandom(SALT_BYTES)
+            password_hash = self.hash_password(password, salt)
             
-            self.conn.commit()
-            print(f"✓ User registered: {username}")
+            with self.write_lock:
+                self.insert_user((username, password_hash, salt, KDF_PARAMS))
+            self.auth_cache.clear()
+            self.username_cache.clear()
+            log.debug("✓ User registered: %s", username)
             return True
             
         except sqlite3.IntegrityError:
             # Username already exists (UNIQUE constraint violation)
-            print(f"✗ Registration failed: Username '{username}' already exists")
+            log.debug("✗ Registration failed: Username '%s' already exists", username)
             return False
         except Exception as e:
-            print(f"✗ Registration error: {e}")
+            log.error("✗ Registration error: %s", e)
             return False
     
-    def authenticate_user(self, username, password):
-       
+    def register_users(self, accounts):
+        
+        # Bulk import of (username, password) pairs. Accounts are checked
+        # against the sign-up rules, and existing or repeated usernames are
+        # dropped before any hashing. scrypt releases the GIL, so the hashes
+        # are computed on a thread pool, then every row goes in with one
+        # executemany in one transaction. Returns the number of accounts
+        # created
+        def user_row(account):
+            username, password = account
+            salt = os.urandom(SALT_BYTES)
+            return (username, self.hash_password(password, salt), salt, KDF_PARAMS)
+        
         try:
-            password_hash = self.hash_password(password)
+            candidates = {}
+            total = 0
+            for username, password in accounts:
+                total += 1
+                username = username.strip()
+                password = password.strip()
+                if len(username) < MIN_USERNAME_LENGTH or len(password) < MIN_PASSWORD_LENGTH:
+                    log.debug("✗ Import skipped invalid account: %r", username)
+                    continue
+                candidates.setdefault(username, password)
             
-            self.cursor.execute(
-                'SELECT * FROM users WHERE username = ? AND password_hash = ?',
-                (username, password_hash)
-            )
+            with self.read_connection() as reader:
+                for username in [u for u in candidates if reader.execute(SELECT_USERNAME_SQL, (u,)).fetchone()]:
+                    del candidates[username]
             
-            result = self.cursor.fetchone()
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+                rows = list(pool.map(user_row, candidates.items()))
+            
+            with self.bulk_write():
+                created = self.import_users(rows).rowcount
+        except Exception as e:
+            log.error("✗ Bulk registration error: %s", e)
+            return 0
+        
+        self.auth_cache.clear()
+        self.username_cache.clear()
+        log.info("✓ Users imported: %d of %d", created, total)
+        return created
+    
+    def authenticate_user(self, username, password):
+       
+        try:
+            # Cache key: a keyed hash of the password, so repeat logins skip
+            # the KDF without the cache holding anything reusable offline
+            key = (username, hmac.new(self.cache_secret, password.encode(), 'sha256').digest())
+            result = self.auth_cache.get(key)
+            if result is None:
+                with self.read_connection() as reader:
+                    row = reader.execute(SELECT_PASSWORD_SQL, (username,)).fetchone()
+                result = row is not None and self.verify_password(username, password, *row)
+                self.auth_cache.put(key, result)
             
             if result:
-                print(f"✓ Authentication successful: {username}")
+                log.debug("✓ Authentication successful: %s", username)
                 return True
             else:
-                print(f"✗ Authentication failed: Invalid credentials for {username}")
+                log.debug("✗ Authentication failed: Invalid credentials for %s", username)
                 return False
                 
         except Exception as e:
-            print(f"✗ Authentication error: {e}")
+            log.error("✗ Authentication error: %s", e)
             return False
     
     def username_exists(self, username):
       
         try:
-            self.cursor.execute(
-                'SELECT username FROM users WHERE username = ?',
-                (username,)
-            )
-            return self.cursor.fetchone() is not None
+            exists = self.username_cache.get(username)
+            if exists is None:
+                with self.read_connection() as reader:
+                    exists = reader.execute(SELECT_USERNAME_SQL, (username,)).fetchone() is not None
+                self.username_cache.put(username, exists)
+            return exists
         except Exception as e:
-            print(f"✗ Error checking username: {e}")
+            log.error("✗ Error checking username: %s", e)
             return False
     
     def log_message(self, username, message):
-      
+        
+        # Queued, not written: one transaction (and one fsync) then covers
+        # a whole batch of messages. The write always happens on the timer
+        # thread; a full batch just starts it without waiting out the
+        # interval, so the caller never blocks on disk
+        with self.pending_lock:
+            self.pending_messages.append((username, message))
+            full = len(self.pending_messages) == MESSAGE_FLUSH_COUNT
+            if self.flush_timer is None or full:
+                if self.flush_timer is not None:
+                    self.flush_timer.cancel()
+                self.flush_timer = threading.Timer(0 if full else MESSAGE_FLUSH_INTERVAL, self.flush_messages)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+        
+        return True
+    
+    def log_messages_bulk(self, rows):
+        
+        # rows: iterable of (username, message), inserted in one transaction
         try:
-            self.cursor.execute(
-                'INSERT INTO messages (username, message) VALUES (?, ?)',
-                (username, message)
-            )
-            self.conn.commit()
+            with self.bulk_write():
+                self.insert_messages(rows)
             return True
         except Exception as e:
-            print(f"✗ Error logging message: {e}")
+            log.error("✗ Error logging message: %s", e)
             return False
     
+    def flush_messages(self):
+        
+        # Write out every queued message now
+        with self.pending_lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            rows = list(self.pending_messages)
+            self.pending_messages.clear()
+        
+        if not rows:
+            return True
+        if self.log_messages_bulk(rows):
+            return True
+        
+        # The insert failed (e.g. database is locked): put the batch back in
+        # front of anything queued since, in order, and try again later
+        with self.pending_lock:
+            self.pending_messages.extendleft(reversed(rows))
+            if self.flush_timer is None and not self.closed:
+                self.flush_timer = threading.Timer(MESSAGE_FLUSH_INTERVAL, self.flush_messages)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+        return False
+    
     def get_chat_history(self, limit=50):
     
+        # Include messages still waiting in the batch
+        self.flush_messages()
+        
         try:
-            self.cursor.execute(
-                'SELECT username, message, timestamp FROM messages ORDER BY timestamp DESC LIMIT ?',
-                (limit,)
-            )
-            messages = self.cursor.fetchall()
-            return list(reversed(messages))
+            with self.read_connection() as reader:
+                return reader.execute(SELECT_HISTORY_SQL, (limit,)).fetchall()
             
         except Exception as e:
-            print(f"✗ Error retrieving chat history: {e}")
+            log.error("✗ Error retrieving chat history: %s", e)
             return []
     
+    def get_chat_history_before(self, before_id, limit=50):
+        
+        # Keyset pagination for scrolling back: seeks to before_id on the
+        # primary key, so every page costs the same however deep it is.
+        # Returns (messages oldest-first, id to pass for the next page),
+        # the id being None once the start of the history is reached
+        self.flush_messages()
+        
+        try:
+            with self.read_connection() as reader:
+                rows = reader.execute(SELECT_HISTORY_BEFORE_SQL, (before_id, limit)).fetchall()
+        except Exception as e:
+            log.error("✗ Error retrieving chat history: %s", e)
+            return [], None
+        
+        # A short page means nothing older is left
+        next_cursor = rows[0][0] if len(rows) == limit else None
+        return [row[1:] for row in rows], next_cursor
+    
     def get_user_count(self):
       
         try:
-            self.cursor.execute('SELECT COUNT(*) FROM users')
-            return self.cursor.fetchone()[0]
+            with self.read_connection() as reader:
+                return reader.execute(SELECT_COUNTER_SQL, ('users',)).fetchone()[0]
         except Exception as e:
-            print(f"✗ Error getting user count: {e}")
+            log.error("✗ Error getting user count: %s", e)
             return 0
     
     def get_message_count(self):
      
+        self.flush_messages()
         try:
-            self.cursor.execute('SELECT COUNT(*) FROM messages')
-            return self.cursor.fetchone()[0]
+            with self.read_connection() as reader:
+                return reader.execute(SELECT_COUNTER_SQL, ('messages',)).fetchone()[0]
         except Exception as e:
-            print(f"✗ Error getting message count: {e}")
+            log.error("✗ Error getting message count: %s", e)
             return 0
     
+    def get_stats(self):
+        
+        # Both counts in one statement instead of two round-trips
+        self.flush_messages()
+        try:
+            with self.read_connection() as reader:
+                return reader.execute(SELECT_STATS_SQL).fetchone()
+        except Exception as e:
+            log.error("✗ Error getting database stats: %s", e)
+            return (0, 0)
+    
     def close(self):
         
-        self.conn.close()
-        print("✓ Database connection closed")
+        self.flush_messages()
+        with self.pending_lock:
+            self.closed = True
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+        # Waits out a batch the timer thread may still be writing
+        with self.write_lock:
+            self.conn.close()
+        log.info("✓ Database connection closed")
 
 
 if __name__ == "__main__":
 
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s", stream=sys.stdout)
     print("Testing Database Module...")
     
     db = Database('test_database.db')
@@ -181,8 +599,14 @@ if __name__ == "__main__":
     
     print("\n4. Testing chat history retrieval:")
     history = db.get_chat_history(10)
-    for username, message, timestamp in history:
-        print(f"  [{timestamp}] {username}: {message}")
+    # Prebuilt template + one writelines() instead of a print() per row
+    fmt = "  [{}] {}: {}\n".format
+    sys.stdout.writelines(fmt(timestamp, username, message) for username, message, timestamp in history)
+    sys.stdout.flush()
+    
+    print("\n5. Testing stats:")
+    users, messages = db.get_stats()
+    print(f"  Users: {users}, Messages: {messages}")
     
     print("\n✓ Database tests complete!")
     db.close()
@@ -0,0 +1,8 @@
+# Protocol package initialization
+from .framing import FrameDecoder, FrameError, append_frame, pack_frame, read_frame, recv_frame, send_frame
+from .auth import MODE_LOGIN, MODE_REGISTER, pack_auth, unpack_auth
+
+__all__ = [
+    'FrameDecoder', 'FrameError', 'append_frame', 'pack_frame', 'read_frame', 'recv_frame', 'send_frame',
+    'MODE_LOGIN', 'MODE_REGISTER', 'pack_auth', 'unpack_auth',
+]
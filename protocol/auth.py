@@ -0,0 +1,63 @@
+# protocol/auth.py - Single-frame login/registration request
+"""
+Authentication request wire format.
+
+The client sends mode, username and password together in one frame:
+
+    mode (1 byte) | user length (2 bytes) | pass length (2 bytes) | user | pass
+
+so the whole login costs one TLS record instead of a prompt/answer
+round-trip per field.
+"""
+
+import struct
+
+from .framing import FrameError
+
+AUTH_HEADER = struct.Struct('>BHH')
+
+MODE_LOGIN = 1
+MODE_REGISTER = 2
+AUTH_MODES = (MODE_LOGIN, MODE_REGISTER)
+
+
+def pack_auth(mode, username, password):
+    """
+    Build an authentication request payload.
+    
+    Args:
+        mode (int): MODE_LOGIN or MODE_REGISTER
+        username (str): Account name
+        password (str): Plain password (TLS protects it in transit)
+    
+    Returns:
+        bytes: Payload for send_frame()
+    """
+    user = username.encode('utf-8')
+    secret = password.encode('utf-8')
+    return AUTH_HEADER.pack(mode, len(user), len(secret)) + user + secret
+
+
+def unpack_auth(payload):
+    """
+    Parse an authentication request payload.
+    
+    Returns:
+        tuple: (mode, username, password)
+    
+    Raises:
+        FrameError: If the mode is unknown or the lengths don't match
+    """
+    if len(payload) < AUTH_HEADER.size:
+        raise FrameError("Authentication request too short")
+    
+    mode, user_len, pass_len = AUTH_HEADER.unpack_from(payload)
+    if mode not in AUTH_MODES:
+        raise FrameError(f"Unknown authentication mode {mode}")
+    if AUTH_HEADER.size + user_len + pass_len != len(payload):
+        raise FrameError("Authentication request length mismatch")
+    
+    user_end = AUTH_HEADER.size + user_len
+    username = payload[AUTH_HEADER.size:user_end].decode('utf-8')
+    password = payload[user_end:].decode('utf-8')
+    return mode, username, password
@@ -0,0 +1,215 @@
+# protocol/framing.py - Length-Prefixed Message Framing
+"""
+Wire framing shared by the server and the clients.
+
+Every message travels as a 4-byte big-endian length followed by that
+many bytes of UTF-8 payload, so message boundaries survive TCP/TLS
+segmentation and coalescing instead of relying on one recv() per message.
+"""
+
+import asyncio
+import struct
+from codecs import utf_8_decode
+
+HEADER = struct.Struct('>I')
+HEADER_SIZE = HEADER.size
+
+# Fallback limit when the caller does not pass one
+MAX_FRAME_SIZE = 64 * 1024
+
+
+class FrameError(Exception):
+    """Raised when the peer sends a malformed or oversized frame."""
+
+
+def pack_frame(payload):
+    """
+    Prefix a payload with its length.
+    
+    Args:
+        payload (bytes): Encoded message
+        
+    Returns:
+        bytes: Header + payload, ready for sendall()
+    """
+    return HEADER.pack(len(payload)) + payload
+
+
+def append_frame(buffer, payload):
+    """
+    Append a framed payload to an outgoing bytearray.
+    
+    Writes the header and payload in place, skipping the temporary
+    header + payload bytes that pack_frame() builds.
+    """
+    buffer += HEADER.pack(len(payload))
+    buffer += payload
+
+
+def send_frame(sock, payload):
+    """
+    Send one framed message on a blocking socket.
+    """
+    sock.sendall(pack_frame(payload))
+
+
+def _recv_exact(sock, view):
+    """
+    Fill a memoryview from the socket.
+    
+    Returns:
+        bool: False if the peer closed before the first byte arrived
+    """
+    received = 0
+    while received < len(view):
+        count = sock.recv_into(view[received:])
+        if not count:
+            if received:
+                raise ConnectionError("Connection closed mid-frame")
+            return False
+        received += count
+    return True
+
+
+def recv_frame(sock, max_size=MAX_FRAME_SIZE):
+    """
+    Receive one framed message from a blocking socket.
+    
+    Args:
+        sock (socket.socket): Connected socket
+        max_size (int): Largest payload accepted
+        
+    Returns:
+        bytes: The payload, or None if the connection was closed
+    """
+    header = bytearray(HEADER_SIZE)
+    if not _recv_exact(sock, memoryview(header)):
+        return None
+    
+    (length,) = HEADER.unpack(header)
+    if length > max_size:
+        raise FrameError(f"Frame of {length} bytes exceeds limit of {max_size}")
+    
+    payload = bytearray(length)
+    if length and not _recv_exact(sock, memoryview(payload)):
+        raise ConnectionError("Connection closed mid-frame")
+    return bytes(payload)
+
+
+async def read_frame(reader, max_size=MAX_FRAME_SIZE):
+    """
+    Receive one framed message from an asyncio StreamReader.
+    
+    Args:
+        reader (asyncio.StreamReader): Connected stream
+        max_size (int): Largest payload accepted
+        
+    Returns:
+        bytes: The payload, or None if the connection was closed
+    """
+    try:
+        header = await reader.readexactly(HEADER_SIZE)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise ConnectionError("Connection closed mid-frame")
+        return None
+    
+    (length,) = HEADER.unpack(header)
+    if length > max_size:
+        raise FrameError(f"Frame of {length} bytes exceeds limit of {max_size}")
+    
+    try:
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        raise ConnectionError("Connection closed mid-frame")
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a stream socket.
+    
+    Data is received with recv_into() straight into one persistent
+    bytearray, so reads allocate nothing; complete frames are sliced out
+    and partial ones stay buffered until the rest arrives.
+    
+    With text=True payloads are decoded as UTF-8 directly from the buffer,
+    skipping the intermediate bytes copy.
+    """
+    
+    def __init__(self, max_size=MAX_FRAME_SIZE, buffer_size=4096, text=False):
+        self.max_size = max_size
+        self.text = text
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0  # First unconsumed byte
+        self.end = 0    # End of received data
+    
+    def recv_from(self, sock):
+        """
+        Read once from the socket.
+        
+        Errors such as socket.timeout or ssl.SSLWantReadError propagate
+        unchanged; nothing is consumed in that case.
+        
+        Returns:
+            list: Complete payloads (bytes, or str when text=True), oldest
+            first, or None if the peer closed the connection
+        """
+        if self.end == len(self.buffer):
+            self._make_room()
+        
+        count = sock.recv_into(self.view[self.end:])
+        if not count:
+            return None
+        self.end += count
+        return self._split_frames()
+    
+    def _make_room(self):
+        pending = self.end - self.start
+        
+        if self.start:
+            # Slide the partial frame to the front
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+        else:
+            # A single frame is larger than the buffer; grow up to the limit
+            size = min(len(self.buffer) * 2, HEADER_SIZE + self.max_size)
+            buffer = bytearray(size)
+            buffer[:pending] = self.view[:pending]
+            self.view.release()
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        
+        self.start = 0
+        self.end = pending
+    
+    def _split_frames(self):
+        buffer = self.buffer
+        start = self.start
+        end = self.end
+        
+        view = self.view
+        text = self.text
+        
+        frames = []
+        while end - start >= HEADER_SIZE:
+            (length,) = HEADER.unpack_from(buffer, start)
+            if length > self.max_size:
+                raise FrameError(f"Frame of {length} bytes exceeds limit of {self.max_size}")
+            
+            frame_end = start + HEADER_SIZE + length
+            if frame_end > end:
+                break
+            payload = view[start + HEADER_SIZE:frame_end]
+            if text:
+                frames.append(utf_8_decode(payload, 'replace')[0])
+            else:
+                frames.append(bytes(payload))
+            start = frame_end
+        
+        # Everything consumed: rewind without copying
+        if start == end:
+            start = end = 0
+        
+        self.start = start
+        self.end = end
+        return frames
@@ -13,8 +13,17 @@ For production, use certificates from a proper CA like Let's Encrypt.
 import ssl
 import socket
 import os
+import time
+import functools
+from collections import OrderedDict
 from pathlib import Path
 
+DEFAULT_CERT_DIR = Path("certificates")
+
+# OpenSSL's SSL_OP_PRIORITIZE_CHACHA, which the ssl module doesn't export
+OP_PRIORITIZE_CHACHA = getattr(ssl, 'OP_PRIORITIZE_CHACHA', 0x00200000)
+
+
 class TLSConfig:
     """TLS configuration for secure communication."""
     
@@ -26,12 +35,12 @@ class TLSConfig:
             cert_file (str): Path to certificate file
             key_file (str): Path to private key file
         """
-        self.cert_dir = Path("certificates")
+        self.cert_dir = DEFAULT_CERT_DIR
         self.cert_file = cert_file or self.cert_dir / "server.crt"
         self.key_file = key_file or self.cert_dir / "server.key"
         
         # Create certificates directory if it doesn't exist
-        self.cert_dir.mkdir(exist_ok=True)
+        self.cert_dir.mkdir(exist_ok=True, mode=0o700)
     
     def generate_self_signed_cert(self):
         """
@@ -43,15 +52,13 @@ class TLSConfig:
             from cryptography import x509
             from cryptography.x509.oid import NameOID
             from cryptography.hazmat.primitives import hashes, serialization
-            from cryptography.hazmat.primitives.asymmetric import rsa
+            from cryptography.hazmat.primitives.asymmetric import ec
             import ipaddress
             import datetime
             
-            # Generate private key
-            private_key = rsa.generate_private_key(
-                public_exponent=65537,
-                key_size=2048,
-            )
+            # Generate private key. P-256 keygen is near instant (RSA-2048
+            # takes hundreds of ms) and ECDSA signs each handshake faster
+            private_key = ec.generate_private_key(ec.SECP256R1())
             
             # Get local IP addresses for certificate
             hostname = socket.gethostname()
@@ -88,17 +95,18 @@ class TLSConfig:
                 critical=False,
             ).sign(private_key, hashes.SHA256())
             
-            # Write certificate to file
-            with open(self.cert_file, "wb") as f:
-                f.write(cert.public_bytes(serialization.Encoding.PEM))
-            
-            # Write private key to file
-            with open(self.key_file, "wb") as f:
-                f.write(private_key.private_bytes(
-                    encoding=serialization.Encoding.PEM,
-                    format=serialization.PrivateFormat.PKCS8,
-                    encryption_algorithm=serialization.NoEncryption()
-                ))
+            # Write private key, then certificate. Each file is replaced
+            # atomically, so a concurrent reader never sees half a PEM. The
+            # pair itself can't be swapped in one step: a reader that lands
+            # between the two gets the new key with the old certificate,
+            # which load_cert_chain() rejects as a mismatch rather than
+            # serving it, and the next attempt finds both files new
+            write_atomic(self.key_file, private_key.private_bytes(
+                encoding=serialization.Encoding.PEM,
+                format=serialization.PrivateFormat.PKCS8,
+                encryption_algorithm=serialization.NoEncryption()
+            ), mode=0o600)
+            write_atomic(self.cert_file, cert.public_bytes(serialization.Encoding.PEM))
             
             print(f"✓ Generated self-signed certificate:")
             print(f"  Certificate: {self.cert_file}")
@@ -122,6 +130,9 @@ class TLSConfig:
         """
         Create SSL context for server.
         
+        The context is built once per (certificate, key) pair and shared,
+        see get_server_context().
+        
         Returns:
             ssl.SSLContext: Configured SSL context for server
         """
@@ -129,62 +140,22 @@ class TLSConfig:
             if not self.generate_self_signed_cert():
                 raise RuntimeError("Failed to generate TLS certificates")
         
-        # Create SSL context for server
-        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-        
-        # Load certificate and private key
-        context.load_cert_chain(
-            certfile=str(self.cert_file),
-            keyfile=str(self.key_file)
-        )
-        
-        # Configure secure cipher suites
-        context.set_ciphers('ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:!aNULL:!MD5:!DSS')
-        
-        # Require TLS 1.2 or higher
-        context.minimum_version = ssl.TLSVersion.TLSv1_2
-        
-        # Enable perfect forward secrecy
-        context.options |= ssl.OP_NO_COMPRESSION
-        
-        print(f"✓ Server TLS context configured")
-        print(f"  Certificate: {self.cert_file}")
-        print(f"  Minimum TLS version: 1.2")
-        
-        return context
+        return get_server_context(str(self.cert_file), str(self.key_file))
     
     def create_client_context(self, verify=True):
         """
         Create SSL context for client.
         
+        The context is built once per (certificate, verify) pair and shared,
+        see get_client_context().
+        
         Args:
             verify (bool): Whether to verify server certificate
             
         Returns:
             ssl.SSLContext: Configured SSL context for client
         """
-        # Create SSL context for client
-        context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-        
-        if not verify:
-            # For development with self-signed certificates
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            print("⚠️  Certificate verification disabled (development mode)")
-        else:
-            # Load our self-signed certificate for verification
-            if self.cert_file.exists():
-                context.load_verify_locations(str(self.cert_file))
-                print(f"✓ Using certificate for verification: {self.cert_file}")
-        
-        # Configure secure settings
-        context.set_ciphers('ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:!aNULL:!MD5:!DSS')
-        context.minimum_version = ssl.TLSVersion.TLSv1_2
-        context.options |= ssl.OP_NO_COMPRESSION
-        
-        print(f"✓ Client TLS context configured")
-        
-        return context
+        return get_client_context(verify, str(self.cert_file))
     
     def verify_certificates(self):
         """
@@ -211,6 +182,181 @@ class TLSConfig:
             return False
 
 
+def write_atomic(path, data, mode=None):
+    """
+    Write data to path through a temporary file and os.replace().
+    
+    Args:
+        path (Path): Destination file
+        data (bytes): File contents
+        mode (int): Permissions the file is created with (default 0o644)
+    """
+    tmp = f"{path}.tmp"
+    
+    # A temp file left by a crashed run may have other permissions;
+    # recreate it so the mode applies from the first byte
+    try:
+        os.unlink(tmp)
+    except FileNotFoundError:
+        pass
+    
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644 if mode is None else mode)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+@functools.lru_cache(maxsize=8)
+def get_server_context(cert_file, key_file):
+    """
+    Build (once) the SSL context used by the server.
+    
+    Parsing the certificate chain and key is the expensive part, so the
+    context is cached per (cert_file, key_file). verify_certificates()
+    builds it as its validity check and start() then reuses it.
+    
+    Args:
+        cert_file (str): Server certificate
+        key_file (str): Server private key
+        
+    Returns:
+        ssl.SSLContext: Configured SSL context for server
+    """
+    # Create SSL context for server
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    
+    # Load certificate and private key
+    context.load_cert_chain(certfile=cert_file, keyfile=key_file)
+    
+    # Configure secure cipher suites
+    context.set_ciphers('ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:!aNULL:!MD5:!DSS')
+    
+    # Require TLS 1.2 or higher
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    
+    # Enable perfect forward secrecy
+    context.options |= ssl.OP_NO_COMPRESSION
+    
+    # The server picks the cipher, preferring AES-GCM, but switches to
+    # ChaCha20-Poly1305 when the client lists it first: clients do that
+    # when they lack AES hardware, and chat records are short enough
+    # that ChaCha's lower fixed cost wins there
+    context.options |= ssl.OP_CIPHER_SERVER_PREFERENCE | OP_PRIORITIZE_CHACHA
+    
+    # Session resumption: tickets stay enabled (TLS 1.2 and 1.3) so a
+    # returning client skips the certificate/key exchange. The clients
+    # cache one session per server, so one TLS 1.3 ticket per handshake
+    # is enough; the default second ticket is never used
+    context.options &= ~ssl.OP_NO_TICKET
+    context.num_tickets = 1
+    
+    print(f"✓ Server TLS context configured")
+    print(f"  Certificate: {cert_file}")
+    print(f"  Minimum TLS version: 1.2")
+    
+    return context
+
+
+@functools.lru_cache(maxsize=4)
+def get_client_context(verify=True, cert_file=str(DEFAULT_CERT_DIR / "server.crt")):
+    """
+    Build (once) the SSL context used by clients.
+    
+    Loading the trust store and cipher lists is expensive, so contexts are
+    cached per (verify, cert_file) and reused for every connection in the
+    process. SSLContext.wrap_socket() is safe to call from several threads.
+    
+    Args:
+        verify (bool): Whether to verify server certificate
+        cert_file (str): Certificate to trust when verifying
+        
+    Returns:
+        ssl.SSLContext: Configured SSL context for client
+    """
+    # Create SSL context for client
+    context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    
+    if not verify:
+        # For development with self-signed certificates
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        print("⚠️  Certificate verification disabled (development mode)")
+    else:
+        # Load our self-signed certificate for verification
+        if Path(cert_file).exists():
+            context.load_verify_locations(cert_file)
+            print(f"✓ Using certificate for verification: {cert_file}")
+    
+    # Configure secure settings
+    context.set_ciphers('ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:!aNULL:!MD5:!DSS')
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.options |= ssl.OP_NO_COMPRESSION
+    
+    # Accept session tickets so reconnects can resume instead of
+    # doing a full handshake
+    context.options &= ~ssl.OP_NO_TICKET
+    
+    print(f"✓ Client TLS context configured")
+    
+    return context
+
+
+class TLSSessionCache:
+    """
+    In-memory LRU of TLS sessions keyed by (host, port).
+    
+    Passing a cached session to wrap_socket() lets the client resume
+    the previous session and skip the full key exchange on reconnect.
+    """
+    
+    def __init__(self, maxsize=32, ttl=24 * 60 * 60):
+        """
+        Args:
+            maxsize (int): Maximum number of cached sessions
+            ttl (int): Seconds a session stays eligible for resumption
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+    
+    def get(self, host, port):
+        """
+        Return a resumable session for host:port, or None.
+        
+        Returns:
+            ssl.SSLSession: Cached session, if still fresh
+        """
+        key = (host, port)
+        session = self._sessions.get(key)
+        if session is None:
+            return None
+        
+        # Honour both our own TTL and the lifetime the server granted
+        lifetime = min(self.ttl, session.timeout or self.ttl)
+        if time.time() - session.time > lifetime:
+            del self._sessions[key]
+            return None
+        
+        self._sessions.move_to_end(key)
+        return session
+    
+    def put(self, host, port, session):
+        """
+        Remember the session negotiated with host:port.
+        
+        Args:
+            session (ssl.SSLSession): Session from a connected socket
+        """
+        if session is None:
+            return
+        
+        key = (host, port)
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.maxsize:
+            self._sessions.popitem(last=False)
+
+
 def setup_tls_for_development():
     """
     Quick setup function for development environment.
@@ -1,32 +1,76 @@
+import asyncio
+import logging
+import logging.handlers
+import queue
 import socket
-import threading
 import sys
 import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import config
-from database.database import Database
+from database.database import Database, MIN_PASSWORD_LENGTH, MIN_USERNAME_LENGTH
+from protocol import FrameError, MODE_LOGIN, MODE_REGISTER, append_frame, pack_frame, read_frame, unpack_auth
 from security.tls_setup import TLSConfig
 
+# Fixed authentication replies, encoded once at import
+AUTH_REQUIRED_B = config.AUTH_REQUIRED.encode('utf-8')
+AUTH_FAILED_B = config.AUTH_FAILED.encode('utf-8')
+USERNAME_EXISTS_B = config.USERNAME_EXISTS.encode('utf-8')
+USERNAME_TOO_SHORT_B = b"ERROR: Username must be at least 3 characters"
+PASSWORD_TOO_SHORT_B = b"ERROR: Password must be at least 4 characters"
+
+# Join/leave announcement pieces; only the username is encoded per event
+SERVER_PREFIX_B = b"[SERVER] "
+JOINED_SUFFIX_B = b" joined the chat!"
+LEFT_SUFFIX_B = b" left the chat."
+HISTORY_FOOTER_B = b"[SERVER] === End of History ==="
+MESSAGE_TOO_LONG_B = f"[SERVER] Message not sent: longer than {config.MAX_MESSAGE_LENGTH} bytes".encode('utf-8')
+
+# Largest authentication request read from an unauthenticated peer
+MAX_AUTH_FRAME = 1024
+
+# Per-connection and per-message events. main() routes logging through a
+# queue, so the event loop only enqueues records; a listener thread does
+# the formatting and the console writes
+log = logging.getLogger(__name__)
+
 
 class ChatServer:
     
+    __slots__ = ('host', 'port', 'server', 'clients', 'recipients',
+                 'pending', 'loop', 'history', 'users_update', 'database',
+                 'tls_config', 'running')
+    
     def __init__(self, host=None, port=None):
         self.host = host or config.SERVER_HOST
         self.port = port or config.SERVER_PORT
         
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        
-        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server = None
         
-
+        # Connected clients: StreamWriter -> username. Only the event loop
+        # thread touches it, so no lock is needed
         self.clients = {}
         
-        self.clients_lock = threading.Lock()
+        # Immutable copy of the writers, rebuilt on join/leave only, so the
+        # far more frequent broadcasts iterate it without copying
+        self.recipients = ()
+        
+        # Outgoing frames per writer, collected during one loop iteration
+        # and written together by flush_pending()
+        self.pending = {}
+        self.loop = None
+        
+        # Task building the framed chat history, shared by every client
+        # that joins until the next chat message invalidates it
+        self.history = None
+        
+        # Pending user-list broadcast; joins and leaves within
+        # USER_LIST_DELAY share one
+        self.users_update = None
         
         self.database = Database(config.DATABASE_NAME)
-       
+        
         self.tls_config = TLSConfig()
         if not self.tls_config.verify_certificates():
             print("[!] TLS certificates not found. Generating new ones...")
@@ -46,271 +90,338 @@ class ChatServer:
     
     def start(self):
         try:
-            tls_context = self.tls_config.create_server_context()
-            self.server_socket = tls_context.wrap_socket(self.server_socket, server_side=True)
-            
-            self.server_socket.bind((self.host, self.port))
-            
-            self.server_socket.listen(config.MAX_CONNECTIONS)
-            
-            self.running = True
-            print(f" Server started successfully!")
-            print(f" Listening on {self.host}:{self.port} (TLS)")
-            print(f" Waiting for secure connections...\n")
-            
-            while self.running:
-                try:
-                    client_socket, address = self.server_socket.accept()
-                    
-                    print(f"[+] New connection from {address[0]}:{address[1]}")
-                    
-                    client_thread = threading.Thread(
-                        target=self.handle_client,
-                        args=(client_socket, address)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                    
-                except KeyboardInterrupt:
-                    print("\n[!] Server shutdown requested...")
-                    break
-                except Exception as e:
-                    if self.running:
-                        print(f"[!] Error accepting connection: {e}")
-        
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            print("\n[!] Server shutdown requested...")
         except Exception as e:
             print(f" Server startup failed: {e}")
         finally:
             self.shutdown()
     
-    def handle_client(self, client_socket, address):
+    async def serve(self):
+        # One event loop multiplexes every client; the TLS handshake runs
+        # per connection inside the loop instead of blocking accept()
+        tls_context = self.tls_config.create_server_context()
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(
+            self.handle_client,
+            self.host,
+            self.port,
+            ssl=tls_context,
+            backlog=config.MAX_CONNECTIONS,
+            reuse_address=True
+        )
+        
+        self.running = True
+        print(f" Server started successfully!")
+        print(f" Listening on {self.host}:{self.port} (TLS)")
+        print(f" Waiting for secure connections...\n")
+        
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.running = False
+            for writer in list(self.clients):
+                writer.close()
+    
+    async def handle_client(self, reader, writer):
+        address = writer.get_extra_info('peername')
+        log.info("[+] New connection from %s:%s", address[0], address[1])
+        
         username = None
         
         try:
-            username = self.authenticate_client(client_socket)
+            self.tune_socket(writer.get_extra_info('socket'))
+            
+            username = await self.authenticate_client(reader, writer)
             
             if not username:
-                print(f"[-] Authentication failed for {address[0]}:{address[1]}")
-                client_socket.close()
+                log.info("[-] Authentication failed for %s:%s", address[0], address[1])
                 return
             
-            with self.clients_lock:
-                self.clients[client_socket] = username
-            
-            print(f"[+] {username} authenticated from {address[0]}:{address[1]}")
-            print(f"[*] Active users: {len(self.clients)}")
-            
-            import time
-            time.sleep(0.1)
+            self.clients[writer] = username
+            self.recipients = tuple(self.clients)
             
-            self.send_chat_history(client_socket)
+            log.info("[+] %s authenticated from %s:%s", username, address[0], address[1])
+            log.info("[*] Active users: %d", len(self.clients))
             
-            time.sleep(0.05)
+            await self.send_chat_history(writer)
             
-            self.broadcast_user_list()
+            welcome_msg = SERVER_PREFIX_B + username.encode('utf-8') + JOINED_SUFFIX_B
+            self.broadcast_membership(welcome_msg, writer)
             
-            welcome_msg = f"[SERVER] {username} joined the chat!"
-            self.broadcast_message(welcome_msg, client_socket)
+            # Bound once; the loop body runs for every message. Clients
+            # decode frames themselves, so the received bytes are relayed
+            # behind the pre-encoded "username: " prefix without a
+            # format/encode round-trip
+            max_frame = config.MAX_FRAME_SIZE
+            max_message = config.MAX_MESSAGE_LENGTH
+            log_message = self.database.log_message
+            send = self.send_to_clients
+            user_prefix = f"{username}: ".encode('utf-8')
             
             while self.running:
                 try:
-                    message_data = client_socket.recv(config.BUFFER_SIZE)
+                    message_data = await read_frame(reader, max_frame)
                     
-                    if not message_data:
-                        break  
+                    if message_data is None:
+                        break
+                    
+                    # Relayed with the username prefix, an oversized message
+                    # would exceed the receivers' frame limit (and be
+                    # replayed to every joiner from history), so it is
+                    # refused here
+                    if len(message_data) > max_message:
+                        self.queue_write(writer, pack_frame(MESSAGE_TOO_LONG_B))
+                        continue
                     
-                    message = message_data.decode('utf-8')
+                    message = message_data.decode('utf-8', 'replace')
                     
                     if message.strip().upper() == '/QUIT':
                         break
                     
-                    formatted_message = f"{username}: {message}"
-                    
-                    self.database.log_message(username, message)
+                    # Only queues the row; the batch is written off the loop
+                    log_message(username, message)
+                    self.history = None
                     
-                    self.broadcast_message(formatted_message, client_socket)
+                    send(pack_frame(user_prefix + message_data), writer)
                     
-                    print(f"[MSG] {formatted_message}")
+                    log.info("[MSG] %s: %s", username, message)
                 
                 except Exception as e:
-                    print(f"[!] Error handling message from {username}: {e}")
+                    log.error("[!] Error handling message from %s: %s", username, e)
                     break
         
         except Exception as e:
-            print(f"[!] Error handling client {address}: {e}")
+            log.error("[!] Error handling client %s: %s", address, e)
         
         finally:
             if username:
-                with self.clients_lock:
-                    if client_socket in self.clients:
-                        del self.clients[client_socket]
+                self.clients.pop(writer, None)
+                self.recipients = tuple(self.clients)
                 
-                leave_msg = f"[SERVER] {username} left the chat."
-                self.broadcast_message(leave_msg, None)
+                leave_msg = SERVER_PREFIX_B + username.encode('utf-8') + LEFT_SUFFIX_B
+                self.broadcast_membership(leave_msg)
                 
-                self.broadcast_user_list()
-                
-                print(f"[-] {username} disconnected")
-                print(f"[*] Active users: {len(self.clients)}")
+                log.info("[-] %s disconnected", username)
+                log.info("[*] Active users: %d", len(self.clients))
             
-            try:
-                client_socket.close()
-            except:
-                pass
+            writer.close()
     
-    def authenticate_client(self, client_socket):
+    def tune_socket(self, sock):
+        # asyncio already disables Nagle on TCP transports; keepalive lets
+        # the kernel find dead peers instead of waiting for a failed write
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        
+        # Probe timing (Linux only)
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, config.KEEPALIVE_IDLE)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, config.KEEPALIVE_INTERVAL)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, config.KEEPALIVE_COUNT)
+    
+    async def authenticate_client(self, reader, writer):
         try:
-            client_socket.send(config.AUTH_REQUIRED.encode('utf-8'))
+            writer.write(pack_frame(AUTH_REQUIRED_B))
             
-            choice = client_socket.recv(1024).decode('utf-8').strip().upper()
+            # Mode, username and password arrive together in one frame. The
+            # wait is bounded so idle or trickling connections can't hold
+            # a slot forever
+            try:
+                request = await asyncio.wait_for(read_frame(reader, MAX_AUTH_FRAME), config.AUTH_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise ConnectionError("Timed out waiting for credentials")
+            if request is None:
+                raise ConnectionError("Client disconnected during authentication")
             
-            if choice not in [config.LOGIN, config.REGISTER]:
-                client_socket.send(config.AUTH_FAILED.encode('utf-8'))
+            try:
+                mode, username, password = unpack_auth(request)
+            except (FrameError, UnicodeDecodeError):
+                writer.write(pack_frame(AUTH_FAILED_B))
                 return None
             
-            client_socket.send(config.ENTER_USERNAME.encode('utf-8'))
-            username = client_socket.recv(1024).decode('utf-8').strip()
+            username = username.strip()
+            password = password.strip()
             
-            if not username or len(username) < 3:
-                client_socket.send("ERROR: Username must be at least 3 characters".encode('utf-8'))
+            if len(username) < MIN_USERNAME_LENGTH:
+                writer.write(pack_frame(USERNAME_TOO_SHORT_B))
                 return None
             
-            client_socket.send(config.ENTER_PASSWORD.encode('utf-8'))
-            password = client_socket.recv(1024).decode('utf-8').strip()
-            
-            if not password or len(password) < 4:
-                client_socket.send("ERROR: Password must be at least 4 characters".encode('utf-8'))
+            if len(password) < MIN_PASSWORD_LENGTH:
+                writer.write(pack_frame(PASSWORD_TOO_SHORT_B))
                 return None
             
-            if choice == config.REGISTER:
-                if self.database.register_user(username, password):
-                    client_socket.send(f"{config.AUTH_SUCCESS}|{username}".encode('utf-8'))
+            # Password hashing is deliberately slow, so the database calls
+            # run on a worker thread while the loop keeps serving others
+            if mode == MODE_REGISTER:
+                if await asyncio.to_thread(self.database.register_user, username, password):
+                    writer.write(pack_frame(f"{config.AUTH_SUCCESS}|{username}".encode('utf-8')))
                     return username
                 else:
-                    client_socket.send(f"{config.USERNAME_EXISTS}".encode('utf-8'))
+                    writer.write(pack_frame(USERNAME_EXISTS_B))
                     return None
             
-            elif choice == config.LOGIN:
-                if self.database.authenticate_user(username, password):
-                    client_socket.send(f"{config.AUTH_SUCCESS}|{username}".encode('utf-8'))
+            elif mode == MODE_LOGIN:
+                if await asyncio.to_thread(self.database.authenticate_user, username, password):
+                    writer.write(pack_frame(f"{config.AUTH_SUCCESS}|{username}".encode('utf-8')))
                     return username
                 else:
-                    client_socket.send(config.AUTH_FAILED.encode('utf-8'))
+                    writer.write(pack_frame(AUTH_FAILED_B))
                     return None
         
         except Exception as e:
-            print(f"[!] Authentication error: {e}")
+            log.error("[!] Authentication error: %s", e)
             return None
     
-    def send_chat_history(self, client_socket, limit=20):
+    async def send_chat_history(self, writer):
         try:
-            history = self.database.get_chat_history(limit)
+            # Joiners arriving together await the same query; shielded so
+            # one joiner's cancellation doesn't cancel it for the others
+            if self.history is None:
+                self.history = asyncio.ensure_future(self.load_history())
+            count, buffer = await asyncio.shield(self.history)
             
-            if history:
-                header_msg = f"[SERVER] === Recent Chat History ({len(history)} messages) ==="
-                client_socket.send(header_msg.encode('utf-8'))
-                
-                import time
-                for username, message, timestamp in history:
-                    formatted_msg = f"{username}: {message}"
-                    client_socket.send(formatted_msg.encode('utf-8'))
-                    time.sleep(0.01)
-                
-                footer_msg = "[SERVER] === End of History ==="
-                client_socket.send(footer_msg.encode('utf-8'))
-                
-                print(f"[*] Sent {len(history)} messages from history")
+            if count:
+                self.queue_write(writer, buffer)
+                log.info("[*] Sent %d messages from history", count)
         
         except Exception as e:
-            print(f"[!] Error sending chat history: {e}")
-
+            self.history = None
+            log.error("[!] Error sending chat history: %s", e)
+    
+    async def load_history(self, limit=20):
+        history = await asyncio.to_thread(self.database.get_chat_history, limit)
+        
+        # Framing keeps the messages apart on the client, so the whole
+        # history goes out as one buffer
+        buffer = bytearray()
+        if history:
+            header_msg = f"[SERVER] === Recent Chat History ({len(history)} messages) ==="
+            append_frame(buffer, header_msg.encode('utf-8'))
+            
+            for username, message, timestamp in history:
+                formatted_msg = f"{username}: {message}"
+                append_frame(buffer, formatted_msg.encode('utf-8'))
+            
+            append_frame(buffer, HISTORY_FOOTER_B)
+        
+        return len(history), bytes(buffer)
+    
+    def broadcast_membership(self, notice, joined=None):
+        # The join/leave notice goes out now (not to the client that
+        # joined); the user list follows once per USER_LIST_DELAY, so a
+        # burst of connects or disconnects costs one list per client
+        # instead of one per event
+        self.send_to_clients(pack_frame(notice), joined)
+        
+        if self.users_update is None:
+            self.users_update = self.loop.call_later(config.USER_LIST_DELAY, self.broadcast_user_list)
+    
     def broadcast_user_list(self):
+        self.users_update = None
+        
         try:
-            with self.clients_lock:
-                online_users = list(self.clients.values())
-            
-            if not online_users:
+            if not self.clients:
                 return
-                
+            
+            online_users = list(self.clients.values())
             users_msg = f"[USERS_LIST] {','.join(online_users)}"
-                
-            message_data = users_msg.encode('utf-8')
-                
-            with self.clients_lock:
-                disconnected = []
-                for client_socket in self.clients:
-                    try:
-                        client_socket.send(message_data)
-                    except Exception as e:
-                        print(f"[!] Error sending user list to client: {e}")
-                        disconnected.append(client_socket)
-                
-                for client_socket in disconnected:
-                    if client_socket in self.clients:
-                        username = self.clients[client_socket]
-                        del self.clients[client_socket]
-                        print(f"[-] Removed disconnected client: {username}")
             
-            print(f"[*] Broadcasted user list: {online_users}")
+            self.send_to_clients(pack_frame(users_msg.encode('utf-8')))
+            
+            log.info("[*] Broadcasted user list: %s", online_users)
         
         except Exception as e:
-            print(f"[!] Error broadcasting user list: {e}")
-
-    def broadcast_message(self, message, sender_socket):
-        message_data = message.encode('utf-8')
-        
-        with self.clients_lock:
-            disconnected = []
-            
-            for client_socket in self.clients:
-                if client_socket == sender_socket:
-                    continue
-                
-                try:
-                    client_socket.send(message_data)
-                except Exception as e:
-                    disconnected.append(client_socket)
-            
-            for client_socket in disconnected:
-                if client_socket in self.clients:
-                    username = self.clients[client_socket]
-                    del self.clients[client_socket]
-                    print(f"[-] Removed disconnected client: {username}")
-
+            log.error("[!] Error broadcasting user list: %s", e)
+    
+    def send_to_clients(self, data, skip=None):
+        # Sends to every recipient except skip. A client that stops reading
+        # is dropped once its backlog passes MAX_CLIENT_BACKLOG instead of
+        # buffering without bound
+        for writer in self.recipients:
+            if writer is skip or writer.is_closing():
+                continue
+            if writer.transport.get_write_buffer_size() > config.MAX_CLIENT_BACKLOG:
+                log.warning("[-] Dropping slow client: %s", self.clients.get(writer))
+                writer.close()
+                continue
+            self.queue_write(writer, data)
+    
+    def queue_write(self, writer, data):
+        # Frames for the same client within one loop iteration are joined,
+        # so a burst costs one TLS record and one send() per client
+        # instead of one per message. A lone frame is kept as the caller's
+        # bytes object, shared by every recipient, and copied only once a
+        # second frame for the same client arrives
+        buffer = self.pending.get(writer)
+        if buffer is None:
+            if not self.pending:
+                self.loop.call_soon(self.flush_pending)
+            self.pending[writer] = data
+        elif type(buffer) is bytearray:
+            buffer += data
+        else:
+            buffer = self.pending[writer] = bytearray(buffer)
+            buffer += data
+    
+    def flush_pending(self):
+        pending, self.pending = self.pending, {}
+        for writer, buffer in pending.items():
+            if not writer.is_closing():
+                writer.write(buffer)
+    
     def shutdown(self):
         print("\n[!] Shutting down server...")
         self.running = False
         
-        with self.clients_lock:
-            for client_socket in list(self.clients.keys()):
-                try:
-                    client_socket.close()
-                except:
-                    pass
-            self.clients.clear()
+        # Client connections were closed with the event loop
+        self.clients.clear()
+        self.recipients = ()
+        
+        # Unflushed frames go with their connections
+        self.pending = {}
+        self.loop = None
+        
+        if self.history is not None and not self.history.done():
+            self.history.cancel()
+        self.history = None
+        
+        if self.users_update:
+            self.users_update.cancel()
+        self.users_update = None
         
-        try:
-            self.server_socket.close()
-        except:
-            pass
-            
         self.database.close()
         
         print(" Server shutdown complete")
 
 
 def main():
-    server = ChatServer()
+    # Server and database events at INFO (per-login database detail is
+    # DEBUG and stays off), written to the console by a listener thread
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        handlers=[logging.handlers.QueueHandler(log_queue)]
+    )
+    listener.start()
     
     try:
-        server.start()
-    except KeyboardInterrupt:
-        print("\n[!] Keyboard interrupt received")
-    except Exception as e:
-        print(f" Server error: {e}")
+        server = ChatServer()
+        
+        try:
+            server.start()
+        except KeyboardInterrupt:
+            print("\n[!] Keyboard interrupt received")
+        except Exception as e:
+            print(f" Server error: {e}")
+        finally:
+            server.shutdown()
     finally:
-        server.shutdown()
+        # Flushes whatever is still queued
+        listener.stop()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()